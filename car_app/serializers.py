@@ -103,8 +103,8 @@ class CarUpdateSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         if instance.status not in ['active', 'unrepaired']:
-            return ValidationError({'status': 'Mashinaning holati faol yoki ta\'mirlanmagan bo\'lgan holatda '
-                                              'o\'zgartirish mumkin'})
+            raise ValidationError({'status': 'Mashinaning holati faol yoki ta\'mirlanmagan bo\'lgan holatda '
+                                             'o\'zgartirish mumkin'})
         instance.name = validated_data.get('name', instance.name)
         instance.car_number = validated_data.get('car_number', instance.car_number)
         instance.car_year = validated_data.get('car_year', instance.car_year)
@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import permissions
@@ -7,6 +8,7 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from car_app.models import Car
+from home_app.pagination import OptInCursorPagination
 from car_app.serializers import CarCreateSerializer, CarListSerializer, CarDetailSerializer, CarUpdateSerializer
 
 
@@ -132,14 +134,15 @@ class ActivateCarAPIView(APIView):
     )
     def post(self, request):
         car_id = request.data.get('car_id')
-        try:
-            car = Car.active_objects.get(id=car_id)
-        except Car.DoesNotExist:
-            return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
-        if car.status == 'active':
-            return Response(data={'error': 'Avtomobil allaqachon faollashtirilgan'}, status=400)
-        car.status = 'active'
-        car.save()
+        with transaction.atomic():
+            try:
+                car = Car.active_objects.select_for_update().get(id=car_id)
+            except Car.DoesNotExist:
+                return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
+            if car.status == 'active':
+                return Response(data={'error': 'Avtomobil allaqachon faollashtirilgan'}, status=400)
+            car.status = 'active'
+            car.save()
         return Response(data={'detail': 'Avtomobil muvaffaqiyatli faollashtirildi'}, status=200)
 
 
@@ -184,14 +187,15 @@ class DeActivateCarAPIView(APIView):
     )
     def post(self, request):
         car_id = request.data.get('car_id')
-        try:
-            car = Car.active_objects.get(id=car_id)
-        except Car.DoesNotExist:
-            return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
-        if car.status == 'unrepaired':
-            return Response(data={'error': 'Avtomobil allaqachon faolsizlantirilgan'}, status=400)
-        car.status = 'unrepaired'
-        car.save()
+        with transaction.atomic():
+            try:
+                car = Car.active_objects.select_for_update().get(id=car_id)
+            except Car.DoesNotExist:
+                return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
+            if car.status == 'unrepaired':
+                return Response(data={'error': 'Avtomobil allaqachon faolsizlantirilgan'}, status=400)
+            car.status = 'unrepaired'
+            car.save()
         return Response(data={'detail': 'Avtomobil muvaffaqiyatli faolsizlantirildi'}, status=200)
 
 
@@ -199,12 +203,18 @@ class DeActivateCarAPIView(APIView):
 class CarListAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CarListSerializer
+    pagination_class = OptInCursorPagination
 
     @swagger_auto_schema(
         responses={200: CarListSerializer(many=True)}
     )
     def get(self, request):
-        cars = Car.active_objects.all()
+        cars = Car.active_objects.select_related('employee')
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(cars, request, view=self)
+        if page is not None:
+            serializer = self.serializer_class(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         serializer = self.serializer_class(cars, many=True)
         return Response(data=serializer.data)
 
@@ -213,12 +223,18 @@ class CarListAPIView(APIView):
 class ActiveCarListAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CarListSerializer
+    pagination_class = OptInCursorPagination
 
     @swagger_auto_schema(
         responses={200: CarListSerializer(many=True)}
     )
     def get(self, request):
-        cars = Car.active_objects.filter(status='active')
+        cars = Car.active_objects.filter(status='active').select_related('employee')
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(cars, request, view=self)
+        if page is not None:
+            serializer = self.serializer_class(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         serializer = self.serializer_class(cars, many=True)
         return Response(data=serializer.data)
 
@@ -261,14 +277,16 @@ class CarUpdateAPIView(APIView):
         }
     )
     def patch(self, request, car_id):
-        try:
-            car = Car.active_objects.get(id=car_id)
-        except Car.DoesNotExist:
-            return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
-        serializer = self.serializer_class(data=request.data, instance=car)
-        serializer.is_valid(raise_exception=True)
-        serializer.employee = request.user
-        serializer.save()
+        with transaction.atomic():
+            # Holat tekshiruvi va saqlash orasida mashina ijaraga berilib qolmasligi uchun qator qulflanadi
+            try:
+                car = Car.active_objects.select_for_update().get(id=car_id)
+            except Car.DoesNotExist:
+                return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
+            serializer = self.serializer_class(data=request.data, instance=car)
+            serializer.is_valid(raise_exception=True)
+            serializer.employee = request.user
+            serializer.save()
         return Response(data=serializer.data, status=200)
 
 
@@ -292,13 +310,14 @@ class CarDeleteAPIView(APIView):
         }
     )
     def delete(self, request, car_id):
-        try:
-            car = Car.active_objects.get(id=car_id)
-        except Car.DoesNotExist:
-            return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
-        if car.status == 'rented':
-            return Response(data={'error': 'Avtomobilni o\'chira olmaysiz!'}, status=400)
-        car.is_active = False
-        car.save()
+        with transaction.atomic():
+            try:
+                car = Car.active_objects.select_for_update().get(id=car_id)
+            except Car.DoesNotExist:
+                return Response(data={'detail': 'Avtomobil topilmadi'}, status=404)
+            if car.status == 'rented':
+                return Response(data={'error': 'Avtomobilni o\'chira olmaysiz!'}, status=400)
+            car.is_active = False
+            car.save()
 
         return Response(status=204)
@@ -45,9 +45,10 @@ INSTALLED_APPS = [
     'payment',
 ]
 
-# CRONJOBS = [
-#     ('0 8 * * *', 'rent_app.management.commands.send_payment_reminders')
-# ]
+CRONJOBS = [
+    # ('0 8 * * *', 'rent_app.management.commands.send_payment_reminders')
+    ('5 0 * * *', 'django.core.management.call_command', ['accrue_penalties']),
+]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -102,6 +103,9 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'home_app.middleware.MetricsMiddleware',
+    'home_app.middleware.RequestInstrumentationMiddleware',
+    'home_app.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -115,6 +119,46 @@ MIDDLEWARE = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# So'rovlar bo'yicha SQL soni va vaqtlarini Server-Timing sarlavhasi va logga yozish
+REQUEST_INSTRUMENTATION = env.bool('REQUEST_INSTRUMENTATION', False)
+# Shu chegaralardan oshgan so'rovlar WARNING darajasida "slow" deb belgilanadi
+REQUEST_INSTRUMENTATION_SLOW_MS = env.float('REQUEST_INSTRUMENTATION_SLOW_MS', 500)
+REQUEST_INSTRUMENTATION_MAX_QUERIES = env.int('REQUEST_INSTRUMENTATION_MAX_QUERIES', 30)
+
+# So'rovlarni cProfile bilan profillash: tasodifiy ulush yoki admin yuborgan sarlavha bo'yicha
+REQUEST_PROFILING = env.bool('REQUEST_PROFILING', False)
+REQUEST_PROFILING_SAMPLE_RATE = env.float('REQUEST_PROFILING_SAMPLE_RATE', 0)
+REQUEST_PROFILING_HEADER = env.str('REQUEST_PROFILING_HEADER', 'X-Profile')
+REQUEST_PROFILING_TIMEOUT = env.int('REQUEST_PROFILING_TIMEOUT', 60 * 60 * 24)
+REQUEST_PROFILING_MAX_STORED = env.int('REQUEST_PROFILING_MAX_STORED', 100)
+
+# Prometheus uchun /metrics. Bir nechta worker bo'lsa PROMETHEUS_MULTIPROC_DIR muhit o'zgaruvchisini o'rnating
+METRICS_ENABLED = env.bool('METRICS_ENABLED', True)
+# /metrics faqat shu token yoki admin sessiyasi bilan ochiladi; METRICS_PUBLIC = True tekshiruvni o'chiradi
+METRICS_TOKEN = env.str('METRICS_TOKEN', None)
+METRICS_PUBLIC = env.bool('METRICS_PUBLIC', False)
+METRICS_AGGREGATE_CACHE_TIMEOUT = env.int('METRICS_AGGREGATE_CACHE_TIMEOUT', 60)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'home_app.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# MySQL qisman indekslarni qo'llab-quvvatlamaydi, ular oddiy composite indeks bo'lib yaratiladi
+SILENCED_SYSTEM_CHECKS = ['models.W037']
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -146,9 +190,43 @@ WSGI_APPLICATION = 'config.wsgi.application'
 #     },
 # }
 
-# TWILIO_ACCOUNT_SID = env.str('TWILIO_ACCOUNT_SID')
-# TWILIO_AUTH_TOKEN = env.str('TWILIO_AUTH_TOKEN')
-# TWILIO_PHONE_NUMBER = env.str('TWILIO_PHONE_NUMBER')
+REDIS_CACHE_URL = env.str('REDIS_CACHE_URL', None)
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Jarimalar vaqt o'tishi bilan o'sadi, shuning uchun dashboard keshi qisqa muddatli
+DASHBOARD_CACHE_TIMEOUT = env.int('DASHBOARD_CACHE_TIMEOUT', 30)
+
+# To'lov jadvali o'zgarishlarini WebSocket orqali yuborishdan oldin yig'ish oynasi (soniya, 0 - darhol)
+PAYMENT_SCHEDULE_BROADCAST_DEBOUNCE = env.float('PAYMENT_SCHEDULE_BROADCAST_DEBOUNCE', 0)
+# Qayta ulangan mijozlarga takror yuborish uchun saqlanadigan xabarlar soni va muddati (soniya).
+# Faqat REDIS_CACHE_URL bilan ishlaydi, LocMemCache'da mijoz har doim snapshot oladi
+PAYMENT_SCHEDULE_REPLAY_BUFFER_SIZE = env.int('PAYMENT_SCHEDULE_REPLAY_BUFFER_SIZE', 1000)
+PAYMENT_SCHEDULE_REPLAY_TIMEOUT = env.int('PAYMENT_SCHEDULE_REPLAY_TIMEOUT', 60 * 60)
+
+SMS_REMINDER_WORKERS = env.int('SMS_REMINDER_WORKERS', 8)
+SMS_REMINDER_RATE_LIMIT = env.float('SMS_REMINDER_RATE_LIMIT', 10)
+
+# SMS backendlari: twilio, console, filebased, locmem (testlar uchun).
+# Standart - twilio: console backend xabarni yubormaydi, lekin ReminderLog uni yuborilgan deb belgilab qo'yadi
+SMS_BACKEND = env.str('SMS_BACKEND', 'rent_app.utils.sms_backends.twilio.SMSBackend')
+SMS_FILE_PATH = env.str('SMS_FILE_PATH', str(BASE_DIR / 'sms_outbox' / 'outbox.jsonl'))
+
+TWILIO_ACCOUNT_SID = env.str('TWILIO_ACCOUNT_SID', None)
+TWILIO_AUTH_TOKEN = env.str('TWILIO_AUTH_TOKEN', None)
+TWILIO_PHONE_NUMBER = env.str('TWILIO_PHONE_NUMBER', None)
 
 
 # DATABASES = {
@@ -0,0 +1,34 @@
+"""
+Lokal benchmark uchun SQLite profili (MySQL va tashqi servislarsiz):
+
+    export DJANGO_SETTINGS_MODULE=config.settings_benchmark
+    python manage.py migrate
+    python manage.py seed_fleet --rentals 300
+    python manage.py run_benchmarks --output benchmark.json
+"""
+import os
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+for name in ('MYSQL_DB_NAME', 'MYSQL_DB_USER', 'MYSQL_DB_PASSWORD', 'MYSQL_DB_HOST', 'MYSQL_DB_PORT'):
+    os.environ.setdefault(name, '')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import BASE_DIR, env  # noqa: E402
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env.str('BENCHMARK_DB_PATH', str(BASE_DIR / 'benchmark.sqlite3')),
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+MEDIA_ROOT = BASE_DIR / 'benchmark_media'
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+SMS_BACKEND = 'rent_app.utils.sms_backends.locmem.SMSBackend'
@@ -0,0 +1,94 @@
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+BUSINESS_METRICS_CACHE_KEY = 'home_app:metrics:business'
+
+REQUEST_LATENCY = Histogram(
+    'rent_car_http_request_duration_seconds', 'Request latency by view',
+    ['view', 'method'],
+)
+REQUESTS = Counter(
+    'rent_car_http_requests', 'Requests by view and response status',
+    ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'rent_car_http_request_queries', 'SQL queries executed per request',
+    ['view'], buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+PDF_RENDER_DURATION = Histogram(
+    'rent_car_pdf_render_duration_seconds', 'Contract PDF render time',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SMS_MESSAGES = Counter(
+    'rent_car_sms_messages', 'SMS send attempts by backend and outcome',
+    ['backend', 'outcome'],
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    'rent_car_websocket_connections', 'Open WebSocket connections',
+    ['consumer'], multiprocess_mode='livesum',
+)
+
+
+def compute_business_metrics():
+    """
+    To'lanmagan jadvallar soni va muddati o'tgan qarz. Qisman indekslar bo'yicha ikkita aggregate so'rov.
+    """
+    from django.db.models import Count, F, Sum
+    from django.utils import timezone
+
+    from rent_app.models import PaymentSchedule
+
+    unpaid = PaymentSchedule.active_objects.values_list('rental__rent_type').annotate(count=Count('id'))
+    overdue = (PaymentSchedule.active_objects.filter(payment_date__lt=timezone.localdate())
+               .values_list('rental__currency')
+               .annotate(amount=Sum(F('amount') + F('penalty_amount') - F('amount_paid'))))
+    return {
+        'unpaid': [(rent_type, count) for rent_type, count in unpaid],
+        'overdue': [(currency.lower(), float(amount or 0)) for currency, amount in overdue],
+    }
+
+
+class BusinessMetricsCollector:
+    """
+    Biznes ko'rsatkichlari faqat /metrics so'ralganda, kesh orqali hisoblanadi
+    """
+
+    def describe(self):
+        # Ro'yxatdan o'tkazishda collect() chaqirilib bazaga murojaat qilinmasligi uchun
+        return []
+
+    def collect(self):
+        data = cache.get_or_set(BUSINESS_METRICS_CACHE_KEY, compute_business_metrics,
+                                settings.METRICS_AGGREGATE_CACHE_TIMEOUT)
+
+        unpaid = GaugeMetricFamily('rent_car_unpaid_payment_schedules', 'Unpaid payment schedules by rent type',
+                                   labels=['rent_type'])
+        for rent_type, count in data['unpaid']:
+            unpaid.add_metric([rent_type], count)
+        yield unpaid
+
+        overdue = GaugeMetricFamily('rent_car_overdue_amount', 'Overdue unpaid amount including penalties',
+                                    labels=['currency'])
+        for currency, amount in data['overdue']:
+            overdue.add_metric([currency], amount)
+        yield overdue
+
+
+REGISTRY.register(BusinessMetricsCollector())
+
+
+def generate_metrics():
+    """
+    Prometheus matn formatidagi ko'rsatkichlar. PROMETHEUS_MULTIPROC_DIR o'rnatilgan bo'lsa
+    (gunicorn, bir nechta worker) barcha jarayonlarniki yig'iladi.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(BusinessMetricsCollector())
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
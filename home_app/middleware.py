@@ -0,0 +1,248 @@
+import cProfile
+import functools
+import json
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from rest_framework import serializers
+
+from .metrics import REQUEST_LATENCY, REQUEST_QUERIES, REQUESTS
+from .profiling import store_profile
+
+logger = logging.getLogger('home_app.instrumentation')
+
+
+class QueryRecorder:
+    """
+    So'rov davomida bajarilgan SQL so'rovlar soni va vaqtini yig'adi
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        # Bir xil SQL qayta-qayta bajarilsa, bu odatda N+1 belgisi
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+
+class SerializerTiming:
+    """
+    So'rov ichidagi serializer.data (to_representation) vaqti va shu vaqtda bajarilgan SQL so'rovlar.
+    Ichma-ich serializerlar tashqi chaqiruv ichida hisoblanadi.
+    """
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.depth = 0
+        self.duration = 0.0
+        self.db_duration = 0.0
+        self.queries = 0
+
+
+_serializer_timing = ContextVar('serializer_timing', default=None)
+
+
+def _timed_to_representation(to_representation):
+    @functools.wraps(to_representation)
+    def wrapper(self, instance):
+        timing = _serializer_timing.get()
+        if timing is None or timing.depth:
+            return to_representation(self, instance)
+
+        recorder = timing.recorder
+        queries, db_duration = recorder.count, recorder.duration
+        timing.depth += 1
+        start = time.perf_counter()
+        try:
+            return to_representation(self, instance)
+        finally:
+            timing.depth -= 1
+            timing.duration += time.perf_counter() - start
+            timing.queries += recorder.count - queries
+            timing.db_duration += recorder.duration - db_duration
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def install_serializer_timing():
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(serializer_class.to_representation, 'instrumented', False):
+            serializer_class.to_representation = _timed_to_representation(serializer_class.to_representation)
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Har bir so'rov uchun Server-Timing sarlavhasi va log yozuvi:
+    db - SQL so'rovlar soni va vaqti, serialize - serializer.data (SerializerMethodField N+1 lari shu yerda,
+    ulardagi SQL vaqti db ichida ham bor), render - JSON renderer, app - qolgan vaqt, total - umumiy vaqt.
+    REQUEST_INSTRUMENTATION = False bo'lsa o'chirilgan.
+    Streaming javoblarda faqat javob qaytguncha bo'lgan vaqt o'lchanadi.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        serializer_timing = SerializerTiming(recorder)
+        request.render_duration = 0.0
+        token = _serializer_timing.set(serializer_timing)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _serializer_timing.reset(token)
+        total = time.perf_counter() - start
+
+        db_ms = recorder.duration * 1000
+        serialize_ms = serializer_timing.duration * 1000
+        # app hisoblanganda serializer ichidagi SQL vaqti ikki marta ayrilmasligi uchun
+        serialize_python_ms = serialize_ms - serializer_timing.db_duration * 1000
+        render_ms = request.render_duration * 1000
+        total_ms = total * 1000
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries"',
+            f'serialize;dur={serialize_ms:.1f};desc="{serializer_timing.queries} queries"',
+            f'render;dur={render_ms:.1f}',
+            f'app;dur={max(total_ms - db_ms - serialize_python_ms - render_ms, 0):.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        metrics = {
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'duplicate_queries': recorder.duplicates,
+            'db_ms': round(db_ms, 1),
+            'serialize_ms': round(serialize_ms, 1),
+            'serialize_queries': serializer_timing.queries,
+            'render_ms': round(render_ms, 1),
+            'total_ms': round(total_ms, 1),
+        }
+        metrics['slow'] = (total_ms > settings.REQUEST_INSTRUMENTATION_SLOW_MS or
+                           recorder.count > settings.REQUEST_INSTRUMENTATION_MAX_QUERIES)
+        logger.log(logging.WARNING if metrics['slow'] else logging.INFO, json.dumps(metrics),
+                   extra={'instrumentation': metrics})
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Response shu yerdan keyin renderer orqali JSON baytlarga aylantiriladi
+        render_start = time.perf_counter()
+
+        def finish_render(rendered_response):
+            request.render_duration = time.perf_counter() - render_start
+
+        response.add_post_render_callback(finish_render)
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    So'rovni cProfile ostida bajaradi: REQUEST_PROFILING_SAMPLE_RATE ulushidagi so'rovlar yoki
+    admin REQUEST_PROFILING_HEADER sarlavhasini yuborganda. Natija so'rov ID si bo'yicha saqlanadi
+    va X-Profile-Id sarlavhasida qaytariladi. REQUEST_PROFILING = False bo'lsa o'chirilgan.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.REQUEST_PROFILING_HEADER.upper().replace('-', '_')
+
+    def __call__(self, request):
+        requested = self.header in request.META
+        sampled = random.random() < settings.REQUEST_PROFILING_SAMPLE_RATE
+        if not requested and not sampled:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ da bir vaqtda faqat bitta profiler ishlashi mumkin
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        # JWT foydalanuvchi view ichida aniqlanadi, shuning uchun admin tekshiruvi javobdan keyin
+        user = getattr(request, 'user', None)
+        if not sampled and not (user is not None and user.is_staff):
+            return response
+
+        request_id = uuid.uuid4().hex
+        resolver_match = getattr(request, 'resolver_match', None)
+        store_profile(request_id, profiler, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'user': user.get_username() if user is not None and user.is_authenticated else None,
+            'duration_ms': round(duration * 1000, 1),
+            'created_at': timezone.now().isoformat(),
+        })
+        response['X-Profile-Id'] = request_id
+        return response
+
+
+class MetricsMiddleware:
+    """
+    /metrics uchun har bir view bo'yicha so'rov vaqti, javob holati va SQL so'rovlar sonini yig'adi.
+    METRICS_ENABLED = False bo'lsa o'chirilgan.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        # Label qiymatlari cheklangan bo'lishi uchun yo'l emas, view nomi ishlatiladi
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else 'unresolved'
+        REQUEST_LATENCY.labels(view, request.method).observe(duration)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        REQUEST_QUERIES.labels(view).observe(recorder.count)
+        return response
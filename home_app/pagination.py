@@ -0,0 +1,84 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Faqat cursor yoki page_size parametri yuborilganda sahifalaydi,
+    aks holda eski mijozlar uchun butun ro'yxat qaytariladi
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
+    offset_query_param = 'offset'
+    # O'zgaruvchan ustunlar: ular bo'yicha cursor sahifalar orasida qatorni takrorlaydi yoki tashlab yuboradi,
+    # shuning uchun bunday saralashda sahifalar offset bilan olinadi
+    offset_ordering_fields = ()
+    page_offset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param not in request.query_params and
+                self.page_size_query_param not in request.query_params):
+            return None
+        ordering = self.get_ordering(request, queryset, view)
+        if any(field.lstrip('-') in self.offset_ordering_fields for field in ordering):
+            return self.paginate_by_offset(queryset.order_by(*ordering), request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        So'ralgan saralash oxiriga har doim id qo'shiladi: teng qiymatli qatorlar tartibi o'zgarmaydi
+        """
+        ordering = super().get_ordering(request, queryset, view)
+        tie_breaker = self.ordering[-1]
+        if tie_breaker.lstrip('-') not in [field.lstrip('-') for field in ordering]:
+            ordering += (tie_breaker,)
+        return ordering
+
+    def paginate_by_offset(self, queryset, request):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        try:
+            self.page_offset = max(int(request.query_params.get(self.offset_query_param, 0)), 0)
+        except ValueError:
+            self.page_offset = 0
+
+        # Keyingi sahifa borligini bilish uchun bitta ortiqcha qator olinadi, COUNT so'rovi bajarilmaydi
+        results = list(queryset[self.page_offset:self.page_offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > self.page_size
+        self.has_previous = self.page_offset > 0
+        return self.page
+
+    def get_next_link(self):
+        if self.page_offset is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.offset_query_param, self.page_offset + self.page_size)
+
+    def get_previous_link(self):
+        if self.page_offset is None:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        offset = self.page_offset - self.page_size
+        if offset <= 0:
+            return remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.offset_query_param, offset)
+
+
+class RentalCursorPagination(OptInCursorPagination):
+    ordering = ('-start_date', '-id')
+    offset_ordering_fields = ('outstanding_amount', 'next_due_date')
+
+
+class EmployeeCursorPagination(OptInCursorPagination):
+    ordering = ('-date_joined', '-id')
+
+
+class PaymentCursorPagination(OptInCursorPagination):
+    ordering = ('created_at', 'id')
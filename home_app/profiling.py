@@ -0,0 +1,58 @@
+import io
+import marshal
+import pstats
+
+from django.conf import settings
+from django.core.cache import cache
+
+PROFILE_CACHE_PREFIX = 'home_app:profile'
+PROFILE_INDEX_KEY = 'home_app:profiles'
+
+
+def profile_cache_key(request_id):
+    return f"{PROFILE_CACHE_PREFIX}:{request_id}"
+
+
+def store_profile(request_id, profiler, meta):
+    """
+    Profil natijasini so'rov ID si bo'yicha keshga saqlaydi va oxirgi profillar ro'yxatini yangilaydi
+    """
+    profiler.create_stats()
+    timeout = settings.REQUEST_PROFILING_TIMEOUT
+    cache.set(profile_cache_key(request_id), dict(meta, stats=marshal.dumps(profiler.stats)), timeout)
+
+    index = [item for item in cache.get(PROFILE_INDEX_KEY, []) if item['id'] != request_id]
+    index.insert(0, dict(meta, id=request_id))
+    cache.set(PROFILE_INDEX_KEY, index[:settings.REQUEST_PROFILING_MAX_STORED], timeout)
+
+
+def get_profile(request_id):
+    return cache.get(profile_cache_key(request_id))
+
+
+def list_profiles():
+    # Keshdan chiqib ketgan profillar ro'yxatda ko'rsatilmaydi
+    index = cache.get(PROFILE_INDEX_KEY, [])
+    stored = cache.get_many([profile_cache_key(item['id']) for item in index])
+    return [item for item in index if profile_cache_key(item['id']) in stored]
+
+
+def format_stats(profile, sort='cumulative', limit=50):
+    """
+    Profilni pstats matn ko'rinishiga o'tkazadi
+    """
+    stats = pstats.Stats(_StatsSource(marshal.loads(profile['stats'])), stream=io.StringIO())
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stats.stream.getvalue()
+
+
+class _StatsSource:
+    """
+    pstats.Stats marshal qilingan statistikani create_stats() qilingan profiler sifatida qabul qiladi
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
@@ -1,3 +1,252 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from car_app.models import Car
+from rent_app.management.commands.seed_fleet import SEED_ADMIN_USERNAME
+from rent_app.models import PaymentSchedule, Rental
+
+employee_model = get_user_model()
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Har bir endpoint uchun SQL so'rovlar soni chegaralangan va ma'lumotlar hajmiga bog'liq emas.
+    So'rov ikki marta bajariladi: kichik ma'lumotlar bilan va seed_fleet orqali kattalashtirilgandan keyin,
+    ikkala holatda ham so'rovlar soni bir xil bo'lishi kerak.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed(rentals=6)
+        cls.admin = employee_model.objects.get(username=SEED_ADMIN_USERNAME)
+
+    @staticmethod
+    def seed(rentals, seed=42):
+        call_command('seed_fleet', rentals=rentals, idle_cars=2, employees=2, closed_ratio=0.4, seed=seed,
+                     stdout=StringIO())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        cache.clear()
+        # O'lchanadigan ijara va jadvallar oldindan tanlanadi, ularni qidirish so'rovlari hisobga kirmaydi
+        self.rental = Rental.active_objects.order_by('-rent_period', 'id').first()
+        self.schedules = list(PaymentSchedule.active_objects.filter(rental=self.rental).order_by('due_date', 'id')[:2])
+
+    def grow(self):
+        self.seed(rentals=9, seed=7)
+
+    def count_queries(self, request, status_code=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertEqual(response.status_code, status_code, getattr(response, 'data', None))
+        return queries
+
+    def assertQueryBudget(self, budget, request, status_code=200):
+        """
+        Endpoint ma'lumotlar ko'payganda ham budget dan ko'p va oldingidan ko'p so'rov bajarmasligi kerak
+        """
+        small = self.count_queries(request, status_code)
+        self.grow()
+        cache.clear()
+        large = self.count_queries(request, status_code)
+
+        executed = '\n'.join(query['sql'] for query in large.captured_queries)
+        self.assertEqual(len(large), len(small),
+                         f"Query count depends on row count: {len(small)} -> {len(large)}\n{executed}")
+        self.assertLessEqual(len(large), budget, f"Query budget exceeded: {len(large)} > {budget}\n{executed}")
+
+    def test_dashboard(self):
+        for rent_type in ['daily', 'monthly', 'credit']:
+            with self.subTest(rent_type=rent_type):
+                cache.clear()
+                self.assertQueryBudget(1, lambda: self.client.get('/api/v1/rentals/dashboard/',
+                                                                  {'rent_type': rent_type}))
+
+    def test_active_rental_list(self):
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/rentals/active/list/'))
+
+    def test_active_rental_list_paginated(self):
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/rentals/active/list/', {'page_size': 5}))
+
+    def test_active_rental_list_ordered_by_outstanding(self):
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/rentals/active/list/',
+                                                          {'ordering': '-outstanding_amount', 'page_size': 5}))
+
+    def test_noactive_rental_list(self):
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/rentals/noactive/list/'))
+
+    def test_noactive_bad_rental_list(self):
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/rentals/noactive/blacklisted/list/'))
+
+    def test_rental_retrieve(self):
+        self.assertQueryBudget(5, lambda: self.client.get(f'/api/v1/rentals/retrieve/{self.rental.id}/'))
+
+    def test_car_list(self):
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/cars/list/'))
+
+    def test_active_car_list(self):
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/cars/active/list/'))
+
+    def test_rental_payments_list(self):
+        self.assertQueryBudget(2, lambda: self.client.get(f'/api/v1/payments/rentals/{self.rental.id}/payments/'))
+
+    def test_payment_create(self):
+        # Bir nechta jadvalni qoplaydigan to'lov
+        data = {'rental_id': self.rental.id, 'amount': str(self.rental.rent_amount * 3)}
+        self.assertQueryBudget(10, lambda: self.client.post('/api/v1/payments/create/', data, format='json'),
+                               status_code=201)
+
+    def test_close_active_rental(self):
+        # Har xil sonli to'lanmagan jadvallari bor ikki ijara: so'rovlar soni jadvallar soniga bog'liq emas
+        rentals = list(Rental.active_objects.exclude(rent_type='credit').order_by('unpaid_count', 'id'))
+        self.assertLess(rentals[0].unpaid_count, rentals[-1].unpaid_count)
+        rentals = iter([rentals[0], rentals[-1]])
+        self.assertQueryBudget(
+            10, lambda: self.client.post('/api/v1/rentals/active/rental/closing/', {'rental_id': next(rentals).id},
+                                         format='json'))
+
+    def test_successfully_paid(self):
+        # Asosiy summasi to'lanmagan jadvallar: qolgan qism daftarga bitta yozuv bilan tushadi
+        schedules = iter(PaymentSchedule.active_objects.filter(rental=self.rental, amount_paid__lt=F('amount'))
+                         .order_by('due_date', 'id')[:2])
+        self.assertQueryBudget(
+            9, lambda: self.client.post(f'/api/v1/rentals/successfully_paid/?payment_id={next(schedules).id}'))
+
+
+class RentalPaginationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = employee_model.objects.create(username='employee')
+        for number in range(5):
+            car = Car.objects.create(employee=cls.employee, name='Car', car_number=f'01A00{number}AA',
+                                     tech_passport_number=str(number))
+            Rental.objects.create(employee=cls.employee, car=car, fullname='Client', phone='+998900000000',
+                                  passport='AA0000000', rent_type='daily', rent_amount=Decimal('100.00'),
+                                  rent_period=3)
+
+    def setUp(self):
+        self.client.force_login(self.employee)
+
+    def fetch_pages(self, url):
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            url = data['next']
+        return pages
+
+    def test_balance_ordering_is_paged_by_offset(self):
+        # Qarzdorlik hamma ijarada bir xil: tartibni faqat id belgilaydi
+        pages = self.fetch_pages('/api/v1/rentals/active/list/?ordering=-outstanding_amount&page_size=2')
+
+        ids = [rental['id'] for page in pages for rental in page['results']]
+        self.assertEqual(ids, list(Rental.active_objects.order_by('-outstanding_amount', '-id')
+                                   .values_list('id', flat=True)))
+        self.assertEqual(len(pages), 3)
+        self.assertIn('offset=2', pages[0]['next'])
+        self.assertNotIn('cursor=', pages[0]['next'])
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('offset=', pages[1]['previous'])
+
+    def test_default_ordering_keeps_cursor(self):
+        pages = self.fetch_pages('/api/v1/rentals/active/list/?page_size=2')
+
+        ids = [rental['id'] for page in pages for rental in page['results']]
+        self.assertEqual(ids, list(Rental.active_objects.order_by('-start_date', '-id').values_list('id', flat=True)))
+        self.assertIn('cursor=', pages[0]['next'])
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='secret', METRICS_PUBLIC=False)
+class MetricsViewTestCase(TestCase):
+    def test_anonymous_request_is_denied(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    def test_token_and_staff_are_allowed(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        self.client.force_login(employee_model.objects.create(username='admin', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_denied_without_token_unless_public(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with self.settings(METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 404)
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True)
+class RequestInstrumentationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_fleet', rentals=3, seed=1, stdout=StringIO())
+        cls.admin = employee_model.objects.get(username=SEED_ADMIN_USERNAME)
+
+    def test_server_timing_reports_serializer_time(self):
+        self.client.force_login(self.admin)
+        with self.assertLogs('home_app.instrumentation', level='INFO') as logs:
+            response = self.client.get('/api/v1/rentals/active/list/')
+
+        self.assertEqual(response.status_code, 200)
+        timings = [metric.split(';')[0].strip() for metric in response['Server-Timing'].split(',')]
+        self.assertEqual(timings, ['db', 'serialize', 'render', 'app', 'total'])
+        metrics = logs.records[-1].instrumentation
+        self.assertGreater(metrics['serialize_ms'], 0)
+        self.assertLessEqual(metrics['serialize_queries'], metrics['queries'])
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_SAMPLE_RATE=0)
+class RequestProfilingTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = employee_model.objects.create(username='admin', is_staff=True)
+        cls.employee = employee_model.objects.create(username='employee')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_admin_request_with_header_is_profiled(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get('/api/v1/rentals/active/list/', HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+        profiles = self.client.get('/api/v1/profiles/').json()
+        self.assertEqual([profile['id'] for profile in profiles], [profile_id])
+        self.assertEqual(profiles[0]['path'], '/api/v1/rentals/active/list/')
+        self.assertEqual(profiles[0]['user'], 'admin')
+        detail = self.client.get(f'/api/v1/profiles/{profile_id}/')
+        self.assertEqual(detail.status_code, 200)
+        self.assertIn('function calls', detail.json()['report'])
+        download = self.client.get(f'/api/v1/profiles/{profile_id}/', {'download': 'true'})
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="{profile_id}.prof"')
+
+    def test_request_without_header_is_not_profiled(self):
+        self.client.force_login(self.admin)
+
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/v1/rentals/active/list/'))
+        self.assertEqual(self.client.get('/api/v1/profiles/').json(), [])
+
+    def test_non_admin_gets_no_profile(self):
+        self.client.force_login(self.employee)
+
+        response = self.client.get('/api/v1/rentals/active/list/', HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.client.get('/api/v1/profiles/').status_code, 403)
+        self.assertEqual(self.client.get('/api/v1/profiles/unknown/').status_code, 403)
@@ -6,4 +6,7 @@ urlpatterns = [
     path('', views.home_view, name='home'),
     path('admin-login/', views.custom_login, name='admin-login'),
     path('accounts/logout/', views.custom_logout, name='admin-logout'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('api/v1/profiles/', views.ProfileListAPIView.as_view()),
+    path('api/v1/profiles/<str:request_id>/', views.ProfileDetailAPIView.as_view()),
 ]
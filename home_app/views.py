@@ -1,8 +1,21 @@
+import hmac
+
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
 from django.contrib.auth import authenticate, login, logout
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from django.conf import settings
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from .metrics import generate_metrics
+from .profiling import format_stats, get_profile, list_profiles
 
 
 def home_view(request):
@@ -36,3 +49,69 @@ def custom_login(request):
 def custom_logout(request):
     logout(request)
     return HttpResponseRedirect('/login/')
+
+
+def metrics_view(request):
+    """
+    Prometheus ko'rsatkichlari. Standart holatda yopiq: "Authorization: Bearer <METRICS_TOKEN>"
+    yoki admin sessiyasi kerak, faqat METRICS_PUBLIC = True bo'lsa hammaga ochiq.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    token = settings.METRICS_TOKEN
+    authorized = (
+        settings.METRICS_PUBLIC
+        or (token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'))
+        or request.user.is_staff
+    )
+    if not authorized:
+        return JsonResponse({'error': 'Ruxsat berilmagan'}, status=403)
+    return HttpResponse(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
+class ProfileListAPIView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(data=list_profiles(), status=200)
+
+
+class ProfileDetailAPIView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter(
+            'download', openapi.IN_QUERY, description="true - snakeviz/pstats uchun .prof fayl",
+            type=openapi.TYPE_BOOLEAN
+        ),
+        openapi.Parameter(
+            'sort', openapi.IN_QUERY, description="Saralash: cumulative, tottime, calls",
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter(
+            'limit', openapi.IN_QUERY, description="Funksiyalar soni",
+            type=openapi.TYPE_INTEGER
+        ),
+    ])
+    def get(self, request, request_id, *args, **kwargs):
+        profile = get_profile(request_id)
+        if profile is None:
+            return Response(data={'detail': 'Profil topilmadi'}, status=404)
+
+        if request.query_params.get('download') in ['true', '1']:
+            response = HttpResponse(profile['stats'], content_type='application/octet-stream')
+            response['Content-Disposition'] = f'attachment; filename="{request_id}.prof"'
+            return response
+
+        sort = request.query_params.get('sort', 'cumulative')
+        if sort not in ['cumulative', 'tottime', 'calls']:
+            return Response(data={'detail': 'Noto\'g\'ri saralash'}, status=400)
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response(data={'detail': 'limit butun son bo\'lishi kerak'}, status=400)
+
+        data = {key: value for key, value in profile.items() if key != 'stats'}
+        data['id'] = request_id
+        data['report'] = format_stats(profile, sort, limit)
+        return Response(data=data, status=200)
@@ -1,9 +1,22 @@
 from django.contrib import admin
 
-from .models import Payment
+from .models import Payment, PaymentAllocation
 
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('employee', 'rental', 'amount', 'created_at')
     ordering = ['-created_at']
+
+
+@admin.register(PaymentAllocation)
+class PaymentAllocationAdmin(admin.ModelAdmin):
+    list_display = ('payment', 'schedule', 'amount', 'penalty_amount', 'created_at')
+    list_select_related = ('payment', 'schedule')
+    ordering = ['-id']
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 15:46
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_alter_payment_amount'),
+        ('rent_app', '0021_rental_balances'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=11)),
+                ('penalty_amount', models.DecimalField(decimal_places=2, default=Decimal('0.0'), max_digits=11)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='payment.payment')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='rent_app.paymentschedule')),
+            ],
+            options={
+                'db_table': 'payment_allocations',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['schedule', 'created_at'], name='payment_alloc_schedule_idx'), models.Index(fields=['payment', 'schedule'], name='payment_alloc_payment_idx'), models.Index(fields=['created_at'], name='payment_alloc_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-18 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_paymentallocation'),
+        ('rent_app', '0021_rental_balances'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentallocation',
+            name='payment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='allocations', to='payment.payment'),
+        ),
+        migrations.AlterField(
+            model_name='paymentallocation',
+            name='schedule',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='allocations', to='rent_app.paymentschedule'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_protect_payment_allocations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentallocation',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='allocations', to='payment.payment'),
+        ),
+    ]
@@ -1,9 +1,11 @@
 from decimal import Decimal
-from django.db import models
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
-from django.utils import timezone
+from rest_framework.exceptions import ValidationError
 
 from rent_app.models import PaymentSchedule, Rental
+from rent_app.utils.payment_allocation import allocate_payment
 
 
 employee_model = get_user_model()
@@ -23,25 +25,54 @@ class Payment(models.Model):
         return f"Payment of {self.amount} due on {self.created_at}"
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            excess_amount = self.amount
-            while excess_amount > 0.0:
-                payment_schedule = PaymentSchedule.active_objects.filter(rental=self.rental).first()
-                if payment_schedule:
-                    excess_amount = payment_schedule.make_payment(excess_amount)
-                else:
-                    excess_amount = Decimal('0.0')
-        payment_schedules = PaymentSchedule.active_objects.filter(rental=self.rental)
-        if payment_schedules.count() == 0:
-            self.rental.is_active = False
-            self.rental.closing_date = timezone.now().date()
-            self.rental.save()
-            car = self.rental.car
-            if self.rental.rent_type != 'credit':
-                car.status = 'active'
-                car.save()
+        with transaction.atomic():
+            if not self.pk:
+                # Bitta ijaraga parallel to'lovlar ijara qatori qulfi orqali navbat bilan bajariladi
+                try:
+                    self.rental = Rental.active_objects.select_for_update().get(pk=self.rental_id)
+                except Rental.DoesNotExist:
+                    raise ValidationError(detail="Ijara shartnoma topilmadi", code=400)
+                self.allocation = allocate_payment(self.rental, self.amount)
+                is_fully_paid = self.allocation.is_fully_paid
             else:
-                car.status = 'sold'
-                car.is_active = False
-                car.save()
-        super().save(*args, **kwargs)
+                is_fully_paid = not PaymentSchedule.active_objects.filter(rental=self.rental).exists()
+            if is_fully_paid:
+                self.rental.close()
+            super().save(*args, **kwargs)
+
+            allocation = getattr(self, 'allocation', None)
+            if allocation is not None and allocation.allocations:
+                PaymentAllocation.objects.bulk_create([
+                    PaymentAllocation(payment=self, schedule_id=item.schedule_id, amount=item.amount,
+                                      penalty_amount=item.penalty_part)
+                    for item in allocation.allocations
+                ])
+                # Qayta saqlanganda takror yozilmasligi uchun
+                self.allocation = None
+
+
+class PaymentAllocation(models.Model):
+    """
+    To'lovning jadvallar bo'yicha taqsimoti. Faqat qo'shiladi, o'zgartirilmaydi.
+    amount - jadvalga tushgan summa, penalty_amount - uning jarimaga to'g'ri kelgan qismi.
+    Taqsimoti bor to'lov yoki jadvalni o'chirib bo'lmaydi (PROTECT), aks holda solishtirish tarixi yo'qoladi.
+    payment bo'sh bo'lsa, jadval xodim tomonidan "to'landi" deb yopilgan (successfully_paid) va summa
+    Payment'siz qabul qilingan. Shu tufayli har bir jadval uchun taqsimotlar yig'indisi amount_paid'ga teng.
+    """
+    payment = models.ForeignKey(Payment, on_delete=models.PROTECT, null=True, blank=True, related_name='allocations')
+    schedule = models.ForeignKey(PaymentSchedule, on_delete=models.PROTECT, related_name='allocations')
+    amount = models.DecimalField(max_digits=11, decimal_places=2)
+    penalty_amount = models.DecimalField(max_digits=11, decimal_places=2, default=Decimal('0.0'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'payment_allocations'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['schedule', 'created_at'], name='payment_alloc_schedule_idx'),
+            models.Index(fields=['payment', 'schedule'], name='payment_alloc_payment_idx'),
+            models.Index(fields=['created_at'], name='payment_alloc_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.amount} of payment {self.payment_id} to schedule {self.schedule_id}"
@@ -3,7 +3,6 @@ from decimal import Decimal
 from django.core.validators import MinValueValidator
 from rest_framework import serializers
 
-from rent_app.models import Rental
 from rent_app.serializers import RentalDashboardSerializer
 from users.serializers import EmployeeSerializer
 from .models import Payment
@@ -18,13 +17,9 @@ class PaymentCreateSerializer(serializers.ModelSerializer):
         fields = ['rental_id', 'amount']
 
     def create(self, validated_data):
-        rental_id = validated_data.pop('rental_id')
-        try:
-            rental = Rental.active_objects.get(pk=rental_id)
-        except Rental.DoesNotExist:
-            raise serializers.ValidationError('Ijara shartnoma topilmadi')
         employee = self.context['request'].user
-        return Payment.objects.create(rental=rental, employee=employee, **validated_data)
+        # Ijara Payment.save ichida qulflangan holda o'qiladi va tekshiriladi
+        return Payment.objects.create(employee=employee, **validated_data)
 
 
 class RentalPaymentsListSerializer(serializers.ModelSerializer):
@@ -1,3 +1,118 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import ProtectedError, Sum
 from django.test import TestCase
+from django.utils import timezone
+
+from car_app.models import Car
+from payment.models import Payment, PaymentAllocation
+from rent_app.models import PaymentSchedule, Rental
+from rent_app.utils import allocate_payment
+
+employee_model = get_user_model()
+
+
+class AllocatePaymentTestCase(TestCase):
+    def setUp(self):
+        self.employee = employee_model.objects.create(username='employee')
+        car = Car.objects.create(employee=self.employee, name='Car', car_number='01A000AA', tech_passport_number='1')
+        self.rental = Rental.objects.create(employee=self.employee, car=car, fullname='Client',
+                                            phone='+998900000000', passport='AA0000000', rent_type='daily',
+                                            rent_amount=Decimal('100.00'), penalty_amount=Decimal('10.00'),
+                                            rent_period=3)
+        self.schedules = list(PaymentSchedule.objects.filter(rental=self.rental).order_by('due_date'))
+        self.now = timezone.now()
+
+    def refreshed_schedules(self):
+        return list(PaymentSchedule.objects.filter(id__in=[schedule.id for schedule in self.schedules])
+                    .order_by('due_date'))
+
+    def test_partial_payment(self):
+        result = allocate_payment(self.rental, Decimal('40.00'), now=self.now)
+
+        self.assertEqual(result.allocated_amount, Decimal('40.00'))
+        self.assertEqual(result.remaining_amount, Decimal('0.00'))
+        self.assertEqual(result.unpaid_count, 3)
+        self.assertFalse(result.is_fully_paid)
+        first = self.refreshed_schedules()[0]
+        self.assertEqual(first.amount_paid, Decimal('40.00'))
+        self.assertFalse(first.is_paid)
+        self.rental.refresh_from_db()
+        self.assertEqual(self.rental.outstanding_amount, Decimal('260.00'))
+
+    def test_payment_spans_several_schedules(self):
+        result = allocate_payment(self.rental, Decimal('250.00'), now=self.now)
+
+        self.assertEqual(result.unpaid_count, 1)
+        self.assertEqual([item.amount for item in result.allocations],
+                         [Decimal('100.00'), Decimal('100.00'), Decimal('50.00')])
+        self.assertEqual(sum(item.amount for item in result.allocations), result.allocated_amount)
+        schedules = self.refreshed_schedules()
+        self.assertEqual([schedule.is_paid for schedule in schedules], [True, True, False])
+        self.assertEqual(schedules[2].amount_paid, Decimal('50.00'))
+
+    def test_overpayment_is_returned_as_remaining_amount(self):
+        result = allocate_payment(self.rental, Decimal('400.00'), now=self.now)
+
+        self.assertEqual(result.allocated_amount, Decimal('300.00'))
+        self.assertEqual(result.remaining_amount, Decimal('100.00'))
+        self.assertEqual(sum(item.amount for item in result.allocations), result.allocated_amount)
+        self.assertTrue(result.is_fully_paid)
+        self.assertTrue(all(schedule.is_paid for schedule in self.refreshed_schedules()))
+
+    def test_penalty_is_included_and_paid_after_principal(self):
+        # Birinchi jadval 2 soat kechikkan: jarima 2 * 10
+        PaymentSchedule.objects.filter(id=self.schedules[0].id).update(due_date=self.now - timedelta(hours=2))
+
+        result = allocate_payment(self.rental, Decimal('110.00'), now=self.now)
+
+        first = result.allocations[0]
+        self.assertEqual(first.penalty_amount, Decimal('20.00'))
+        self.assertEqual(first.amount, Decimal('110.00'))
+        self.assertEqual(first.penalty_part, Decimal('10.00'))
+        self.assertFalse(first.is_paid)
+
+        result = allocate_payment(self.rental, Decimal('10.00'), now=self.now)
+
+        self.assertEqual(result.allocations[0].penalty_part, Decimal('10.00'))
+        self.assertTrue(result.allocations[0].is_paid)
+        schedule = self.refreshed_schedules()[0]
+        self.assertEqual(schedule.amount_paid, Decimal('120.00'))
+        self.assertEqual(schedule.penalty_amount, Decimal('20.00'))
+
+    def test_schedules_are_paid_in_due_date_order(self):
+        # id tartibi muddat tartibiga mos kelmaydi
+        first, second, last = self.schedules
+        PaymentSchedule.objects.filter(id=last.id).update(due_date=first.due_date - timedelta(days=1))
+
+        result = allocate_payment(self.rental, Decimal('150.00'), now=self.now)
+
+        self.assertEqual([item.schedule_id for item in result.allocations], [last.id, first.id])
+        last.refresh_from_db()
+        self.assertTrue(last.is_paid)
+
+    def test_ledger_rows_match_allocated_amount(self):
+        PaymentSchedule.objects.filter(id=self.schedules[0].id).update(due_date=timezone.now() - timedelta(hours=3))
+
+        payment = Payment.objects.create(rental=self.rental, employee=self.employee, amount=Decimal('500.00'))
+
+        allocations = PaymentAllocation.objects.filter(payment=payment)
+        totals = allocations.aggregate(amount=Sum('amount'), penalty=Sum('penalty_amount'))
+        schedules = self.refreshed_schedules()
+        self.assertEqual(allocations.count(), 3)
+        self.assertEqual(totals['amount'], sum(schedule.amount_paid for schedule in schedules))
+        self.assertEqual(totals['amount'], Decimal('300.00') + schedules[0].penalty_amount)
+        self.assertEqual(totals['penalty'], schedules[0].penalty_amount)
+        self.rental.refresh_from_db()
+        self.assertFalse(self.rental.is_active)
+
+    def test_allocated_payment_and_schedule_cannot_be_deleted(self):
+        payment = Payment.objects.create(rental=self.rental, employee=self.employee, amount=Decimal('50.00'))
 
-# Create your tests here.
+        with self.assertRaises(ProtectedError):
+            payment.delete()
+        with self.assertRaises(ProtectedError):
+            self.schedules[0].delete()
+        self.assertEqual(PaymentAllocation.objects.filter(payment=payment).count(), 1)
@@ -5,6 +5,7 @@ from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from home_app.pagination import PaymentCursorPagination
 from rent_app.models import Rental
 from .serializers import PaymentCreateSerializer, RentalPaymentsListSerializer
 from .models import Payment
@@ -20,6 +21,7 @@ class PaymentCreateAPIView(generics.CreateAPIView):
 class RentalPaymentsListAPIView(generics.ListAPIView):
     serializer_class = RentalPaymentsListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaymentCursorPagination
     filter_backends = []
 
     def get_queryset(self):
@@ -30,7 +32,8 @@ class RentalPaymentsListAPIView(generics.ListAPIView):
             rental = Rental.objects.get(pk=rental_id)
         except Rental.DoesNotExist:
             raise NotFound("Ijara shartnomasi topilmadi")
-        return Payment.objects.filter(rental=rental).order_by('created_at')
+        return Payment.objects.filter(rental=rental).select_related(
+            'employee', 'rental', 'rental__car').order_by('created_at')
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Rental, PaymentSchedule
+from .models import Rental, PaymentSchedule, ReminderLog
 
 
 @admin.register(Rental)
@@ -16,3 +16,9 @@ class PaymentScheduleAdmin(admin.ModelAdmin):
     list_display = ['rental', 'due_date', 'amount', 'penalty_amount', 'amount_paid', 'is_paid']
     list_filter = ['rental']
     search_fields = ['rental__fullname']
+
+
+@admin.register(ReminderLog)
+class ReminderLogAdmin(admin.ModelAdmin):
+    list_display = ['payment_schedule', 'kind', 'reminder_date', 'sid', 'created_at']
+    list_filter = ['kind', 'reminder_date']
@@ -1,19 +1,133 @@
 import json
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.core.serializers.json import DjangoJSONEncoder
+
+from home_app.metrics import WEBSOCKET_CONNECTIONS
+from rent_app.topics import PAYMENT_SCHEDULES_GROUP, topic_group_name
 
 
 class PaymentScheduleConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        self.group_name = 'payment_schedules'
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        self.subscriptions = {}
         await self.accept()
+        WEBSOCKET_CONNECTIONS.labels('payment_schedule').inc()
+
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        topics = [topic for value in query.get('topics', []) for topic in value.split(',') if topic]
+        if topics:
+            await self.subscribe(topics)
+        else:
+            # Obuna bo'lmagan eski mijozlar barcha o'zgarishlarni oladi
+            await self.channel_layer.group_add(PAYMENT_SCHEDULES_GROUP, self.channel_name)
+            self.subscriptions[None] = PAYMENT_SCHEDULES_GROUP
+
+        # ?since=N - uzilishdan keyin N-xabardan keyingi o'zgarishlarni olish
+        since = query.get('since')
+        if since:
+            await self.resume(since[-1])
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        WEBSOCKET_CONNECTIONS.labels('payment_schedule').dec()
+        for group_name in self.subscriptions.values():
+            await self.channel_layer.group_discard(group_name, self.channel_name)
 
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        # Process received data
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            await self.send(text_data=json.dumps({'event': 'error', 'detail': 'Invalid JSON'}))
+            return
+        if not isinstance(data, dict):
+            await self.send(text_data=json.dumps({'event': 'error', 'detail': 'Invalid message'}))
+            return
+
+        action = data.get('action')
+        topics = data.get('topics') or []
+        if action == 'subscribe':
+            await self.subscribe(topics)
+        elif action == 'unsubscribe':
+            await self.unsubscribe(topics)
+        elif action == 'resume':
+            await self.resume(data.get('seq'))
+        elif action == 'snapshot':
+            await self.send_snapshot()
+        else:
+            await self.send(text_data=json.dumps({'event': 'error', 'detail': f'Unknown action: {action}'}))
+
+    async def subscribe(self, topics):
+        invalid = []
+        for topic in topics:
+            group_name = topic_group_name(topic)
+            if group_name is None:
+                invalid.append(topic)
+            elif topic not in self.subscriptions:
+                await self.channel_layer.group_add(group_name, self.channel_name)
+                self.subscriptions[topic] = group_name
+
+        # Mavzuga obuna bo'lgan mijoz umumiy guruhdan chiqariladi
+        if None in self.subscriptions and len(self.subscriptions) > 1:
+            await self.channel_layer.group_discard(self.subscriptions.pop(None), self.channel_name)
+        await self.send_subscriptions(invalid)
+
+    async def unsubscribe(self, topics):
+        for topic in topics:
+            group_name = self.subscriptions.pop(topic, None) if topic is not None else None
+            if group_name:
+                await self.channel_layer.group_discard(group_name, self.channel_name)
+        await self.send_subscriptions([])
+
+    async def resume(self, seq):
+        """
+        seq dan keyingi xabarlarni buferdan qayta yuboradi, bufer yetmasa snapshot yuboradi
+        """
+        from rent_app.utils.schedule_broadcast import get_events_since
+
+        try:
+            seq = int(seq)
+        except (TypeError, ValueError):
+            await self.send(text_data=json.dumps({'event': 'error', 'detail': 'Invalid seq'}))
+            return
+
+        events = await database_sync_to_async(get_events_since)(seq)
+        if events is None:
+            await self.send_snapshot()
+            return
+
+        group_names = set(self.subscriptions.values())
+        for event_seq, messages in events:
+            # Bir xabar bir nechta obuna guruhiga tushgan bo'lsa, jadvallar bir marta yuboriladi
+            schedules = {}
+            removed = set()
+            for group_name, data in messages.items():
+                if group_name in group_names:
+                    delta = json.loads(data)
+                    schedules.update((schedule['id'], schedule) for schedule in delta['schedules'])
+                    removed.update(delta['removed'])
+            if schedules or removed:
+                delta = {
+                    'event': 'delta',
+                    'schedules': [schedules[schedule_id] for schedule_id in sorted(schedules)],
+                    'removed': sorted(removed),
+                    'seq': event_seq,
+                }
+                await self.send_update({'data': json.dumps(delta)})
+        await self.send(text_data=json.dumps({'event': 'resumed', 'seq': events[-1][0] if events else seq}))
+
+    async def send_snapshot(self):
+        from rent_app.utils.schedule_broadcast import build_snapshot
+
+        snapshot = await database_sync_to_async(build_snapshot)([topic for topic in self.subscriptions if topic])
+        await self.send(text_data=json.dumps(snapshot, cls=DjangoJSONEncoder))
+
+    async def send_subscriptions(self, invalid):
+        message = {'event': 'subscriptions', 'topics': sorted(topic for topic in self.subscriptions if topic)}
+        if invalid:
+            message['invalid'] = invalid
+        await self.send(text_data=json.dumps(message))
 
     async def send_update(self, event):
-        await self.send(text_data=json.dumps(event["data"]))
+        # data broadcast_schedules'da JSON'ga o'girilgan, qayta kodlanmaydi
+        await self.send(text_data=event["data"])
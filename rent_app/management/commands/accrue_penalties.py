@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from rent_app.utils import accrue_penalties
+from rent_app.utils.penalty_accrual import DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recalculate and store penalties for unpaid overdue payment schedules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Number of schedules updated per statement')
+
+    def handle(self, *args, **options):
+        updated = accrue_penalties(chunk_size=options['chunk_size'])
+        for rent_type, count in updated.items():
+            self.stdout.write(self.style.SUCCESS(f"Updated penalties for {count} {rent_type} schedules"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from rent_app.utils import get_export_queryset, serialize_rentals, write_contracts_zip
+from rent_app.utils.contract_export import EXPORT_STATUSES
+
+
+class Command(BaseCommand):
+    help = 'Export rental contract PDFs into a ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', choices=EXPORT_STATUSES, default='active')
+        parser.add_argument('--year', type=int, help='Closing year (closed rentals only)')
+        parser.add_argument('--month', type=int, help='Closing month (closed rentals only)')
+        parser.add_argument('--workers', type=int, default=None, help='Number of rendering processes')
+        parser.add_argument('--output', default='contracts.zip')
+
+    def handle(self, *args, **options):
+        queryset = get_export_queryset(options['status'], options['year'], options['month'])
+        rentals_data = serialize_rentals(queryset)
+        write_contracts_zip(options['output'], rentals_data, options['workers'])
+        self.stdout.write(self.style.SUCCESS(f"Exported {len(rentals_data)} contracts to {options['output']}"))
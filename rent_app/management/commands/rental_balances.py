@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rent_app.models import BALANCE_FIELDS, Rental
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Verify stored rental balances against payment schedules, optionally rebuilding them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recalculate balances that do not match')
+        parser.add_argument('--all', action='store_true', help='With --rebuild, recalculate every rental')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            if not options['rebuild']:
+                raise CommandError('--all requires --rebuild')
+            rebuilt = Rental.objects.refresh_balances()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt balances of {rebuilt} rentals"))
+            return
+
+        expected_fields = [f'expected_{name}' for name in BALANCE_FIELDS]
+        checked, mismatched = 0, []
+        last_id = 0
+        while True:
+            rows = list(
+                Rental.objects.filter(id__gt=last_id).order_by('id').with_expected_balances()
+                .values_list('id', *BALANCE_FIELDS, *expected_fields)[:options['chunk_size']]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            checked += len(rows)
+
+            for row in rows:
+                stored = row[1:len(BALANCE_FIELDS) + 1]
+                expected = row[len(BALANCE_FIELDS) + 1:]
+                differences = [f"{name}: {value} != {expected_value}"
+                               for name, value, expected_value in zip(BALANCE_FIELDS, stored, expected)
+                               if value != expected_value]
+                if differences:
+                    mismatched.append(row[0])
+                    self.stdout.write(self.style.WARNING(f"Rental {row[0]}: {', '.join(differences)}"))
+
+        if mismatched and options['rebuild']:
+            with transaction.atomic():
+                Rental.objects.filter(id__in=mismatched).refresh_balances()
+            self.stdout.write(self.style.SUCCESS(f"Checked {checked} rentals, rebuilt {len(mismatched)}"))
+        elif mismatched:
+            raise CommandError(f"Checked {checked} rentals, {len(mismatched)} balances do not match. "
+                               f"Run with --rebuild to fix them.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Checked {checked} rentals, all balances match"))
@@ -0,0 +1,157 @@
+import json
+import platform
+import statistics
+import sys
+import time
+from io import StringIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+
+from home_app.middleware import QueryRecorder
+from payment.models import Payment
+from rent_app.models import PaymentSchedule, Rental
+from rent_app.serializers import RentalRetrieveSerializer
+from rent_app.utils import render_pdf
+from .seed_fleet import SEED_ADMIN_USERNAME
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time the main endpoints and jobs against the current database and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed runs per benchmark')
+        parser.add_argument('--only', nargs='*', help='Run only these benchmarks')
+        parser.add_argument('--output', help='JSON file (stdout if omitted)')
+
+    def handle(self, *args, **options):
+        try:
+            admin = get_user_model().objects.get(username=SEED_ADMIN_USERNAME)
+        except get_user_model().DoesNotExist:
+            raise CommandError('No seeded data, run "manage.py seed_fleet" first')
+
+        self.client = Client()
+        self.client.force_login(admin)
+
+        active_rental = (Rental.active_objects.annotate(schedule_count=Count('payment_schedule'))
+                         .order_by('-schedule_count').first())
+        if active_rental is None:
+            raise CommandError('No active rentals in the database')
+
+        benchmarks = {
+            'dashboard_daily': lambda: self.get('/api/v1/rentals/dashboard/?rent_type=daily', clear_cache=True),
+            'dashboard_monthly': lambda: self.get('/api/v1/rentals/dashboard/?rent_type=monthly', clear_cache=True),
+            'dashboard_credit': lambda: self.get('/api/v1/rentals/dashboard/?rent_type=credit', clear_cache=True),
+            'dashboard_cached': lambda: self.get('/api/v1/rentals/dashboard/?rent_type=daily'),
+            'active_rentals_list': lambda: self.get('/api/v1/rentals/active/list/'),
+            'noactive_rentals_list': lambda: self.get('/api/v1/rentals/noactive/list/'),
+            'rental_retrieve': lambda: self.get(f'/api/v1/rentals/retrieve/{active_rental.id}/'),
+            'rental_payments_list': lambda: self.get(f'/api/v1/payments/rentals/{active_rental.id}/payments/'),
+            'car_list': lambda: self.get('/api/v1/cars/list/'),
+            'payment_create': lambda: self.rollback(self.create_payment, active_rental),
+            'pdf_render': lambda: self.render_contract(active_rental),
+            'send_payment_reminders': lambda: self.rollback(self.send_reminders),
+        }
+        if options['only']:
+            unknown = set(options['only']) - set(benchmarks)
+            if unknown:
+                raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+            benchmarks = {name: benchmarks[name] for name in options['only']}
+
+        results = {}
+        for name, benchmark in benchmarks.items():
+            results[name] = self.measure(benchmark, options['repeat'], options['warmup'])
+            self.stderr.write(f"{name}: median {results[name]['median_ms']} ms, {results[name]['queries']} queries")
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+                'dataset': {
+                    'rentals': Rental.objects.count(),
+                    'active_rentals': Rental.active_objects.count(),
+                    'payment_schedules': PaymentSchedule.objects.count(),
+                    'payments': Payment.objects.count(),
+                    'benchmark_rental_id': active_rental.id,
+                },
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            sys.stdout.write(output + '\n')
+
+    def measure(self, benchmark, repeat, warmup):
+        for _ in range(warmup):
+            benchmark()
+        # Client har so'rov boshida queries_log ni tozalaydi, shuning uchun execute_wrapper orqali sanaymiz
+        queries = QueryRecorder()
+        with connection.execute_wrapper(queries):
+            benchmark()
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            benchmark()
+            timings.append((time.perf_counter() - start) * 1000)
+        return {
+            'runs': repeat,
+            'queries': queries.count,
+            'min_ms': round(min(timings), 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'max_ms': round(max(timings), 2),
+        }
+
+    def get(self, url, clear_cache=False):
+        if clear_cache:
+            cache.clear()
+        response = self.client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+        return response
+
+    def rollback(self, func, *args):
+        """
+        Ma'lumotlarni o'zgartiradigan benchmarklar har safar bir xil holatdan boshlanishi uchun
+        """
+        try:
+            with transaction.atomic():
+                func(*args)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_payment(self, rental):
+        response = self.client.post('/api/v1/payments/create/',
+                                    {'rental_id': rental.id, 'amount': str(rental.rent_amount)},
+                                    content_type='application/json')
+        if response.status_code != 201:
+            raise CommandError(f"Payment creation returned {response.status_code}")
+
+    def render_contract(self, rental):
+        # pdf_writer natijani keshlaydi, shuning uchun PDF ni to'g'ridan-to'g'ri render qilamiz
+        data = RentalRetrieveSerializer(rental, context={'now': timezone.now()}).data
+        render_pdf(data)
+
+    def send_reminders(self):
+        call_command('send_payment_reminders', rate=0, stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,155 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from car_app.models import Car
+from payment.models import Payment, PaymentAllocation
+from rent_app.models import PaymentSchedule, Rental
+
+SEED_PREFIX = 'seed_'
+SEED_ADMIN_USERNAME = 'seed_admin'
+
+# Ijara turi bo'yicha muddat (kun yoki oy), to'lov miqdori (so'm) va jarima foizi
+RENT_PROFILES = {
+    'daily': {'period': (7, 90), 'amount': (200_000, 500_000), 'penalty_rate': Decimal('0.005')},
+    'monthly': {'period': (3, 12), 'amount': (4_000_000, 12_000_000), 'penalty_rate': Decimal('0.01')},
+    'credit': {'period': (12, 36), 'amount': (3_000_000, 8_000_000), 'penalty_rate': Decimal('0.0')},
+}
+USD_RATE = 12_500
+CAR_NAMES = ['Chevrolet Cobalt', 'Chevrolet Gentra', 'Chevrolet Nexia 3', 'Chevrolet Malibu', 'Kia K5',
+             'Hyundai Sonata', 'BYD Song Plus', 'Chevrolet Spark', 'Chevrolet Damas', 'Chevrolet Tracker']
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic fleet (employees, cars, rentals, payments) for local benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=5)
+        parser.add_argument('--rentals', type=int, default=200)
+        parser.add_argument('--idle-cars', type=int, default=20, help='Cars without any rental')
+        parser.add_argument('--closed-ratio', type=float, default=0.3, help='Share of fully paid (closed) rentals')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible datasets')
+        parser.add_argument('--flush', action='store_true', help='Delete previously seeded data first')
+
+    def handle(self, *args, **options):
+        employee_model = get_user_model()
+        if options['flush']:
+            with transaction.atomic():
+                # To'lov taqsimoti PROTECT bilan himoyalangan, sintetik ma'lumotlarniki oldin o'chiriladi
+                PaymentAllocation.objects.filter(schedule__rental__employee__username__startswith=SEED_PREFIX).delete()
+                # Mashina, ijara, jadval va to'lovlar xodim orqali CASCADE bilan o'chadi
+                deleted, _ = employee_model.objects.filter(username__startswith=SEED_PREFIX).delete()
+            self.stdout.write(f"Deleted {deleted} seeded objects")
+
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        run_id = now.strftime('%y%m%d%H%M%S%f')
+
+        employees = self.create_employees(employee_model, options['employees'], run_id)
+        cars = self.create_cars(employees, options['rentals'] + options['idle_cars'], run_id, rng)
+
+        rent_types = list(RENT_PROFILES)
+        payments = 0
+        for i in range(options['rentals']):
+            rent_type = rent_types[i % len(rent_types)]
+            closed = rng.random() < options['closed_ratio']
+            with transaction.atomic():
+                rental = self.create_rental(cars[i], employees[i % len(employees)], rent_type, closed, rng)
+                payments += self.create_payments(rental, closed, now, rng)
+
+        # To'lanmagan jadvallar uchun jarimalarni yozib qo'yamiz
+        call_command('accrue_penalties', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(employees)} employees, {len(cars)} cars, {options['rentals']} rentals, "
+            f"{PaymentSchedule.objects.filter(rental__employee__in=employees).count()} payment schedules, "
+            f"{payments} payments"))
+
+    def create_employees(self, employee_model, count, run_id):
+        admin, created = employee_model.objects.get_or_create(
+            username=SEED_ADMIN_USERNAME,
+            defaults={'fullname': 'Seed Admin', 'phone': '+998900000000', 'is_staff': True, 'is_superuser': True},
+        )
+        if created:
+            admin.set_unusable_password()
+            admin.save(update_fields=['password'])
+
+        employees = []
+        for i in range(count):
+            employee = employee_model(username=f"{SEED_PREFIX}{run_id}_{i}", fullname=f"Xodim {i}",
+                                      phone=f"+99890{i:07d}")
+            employee.set_unusable_password()
+            employees.append(employee)
+        return [admin] + employee_model.objects.bulk_create(employees)
+
+    def create_cars(self, employees, count, run_id, rng):
+        cars = [
+            Car(employee=employees[i % len(employees)], name=rng.choice(CAR_NAMES),
+                car_number=f"{SEED_PREFIX}{run_id}_{i}", car_year=rng.randint(2015, 2024),
+                tech_passport_number=f"AAF{rng.randint(1000000, 9999999)}")
+            for i in range(count)
+        ]
+        return Car.objects.bulk_create(cars)
+
+    def create_rental(self, car, employee, rent_type, closed, rng):
+        profile = RENT_PROFILES[rent_type]
+        rent_period = rng.randint(*profile['period'])
+        currency = 'usd' if rng.random() < 0.1 else 'uzs'
+        rent_amount = Decimal(rng.randrange(profile['amount'][0], profile['amount'][1], 10_000))
+        if currency == 'usd':
+            rent_amount = (rent_amount / USD_RATE).quantize(Decimal('1'))
+
+        rental = Rental.objects.create(
+            employee=employee,
+            car=car,
+            fullname=f"Mijoz {car.id}",
+            phone=f"+99893{rng.randint(0, 9999999):07d}",
+            passport=f"AB{rng.randint(1000000, 9999999)}",
+            currency=currency,
+            rent_type=rent_type,
+            rent_amount=rent_amount,
+            rent_period=rent_period,
+            penalty_amount=(rent_amount * profile['penalty_rate']).quantize(Decimal('0.01')),
+        )
+
+        # Ijarani o'tmishga suramiz: yopilganlar to'liq muddatini o'tagan, qolganlari o'rtasida
+        period_days = rent_period if rent_type == 'daily' else rent_period * 30
+        age = period_days if closed else rng.randint(0, period_days)
+        offset = timedelta(days=age)
+        Rental.objects.filter(pk=rental.pk).update(start_date=rental.start_date - offset,
+                                                   end_date=rental.end_date - offset)
+        rental.start_date -= offset
+        rental.end_date -= offset
+
+        schedules = list(PaymentSchedule.objects.filter(rental=rental))
+        for schedule in schedules:
+            schedule.due_date -= offset
+            schedule.payment_date = timezone.localdate(schedule.due_date)
+        PaymentSchedule.objects.bulk_update(schedules, ['due_date', 'payment_date'])
+        rental.refresh_balance()
+        return rental
+
+    def create_payments(self, rental, closed, now, rng):
+        schedules = list(PaymentSchedule.objects.filter(rental=rental).order_by('due_date', 'id'))
+        if closed:
+            # Yopilgan ijara: qarz bir necha bo'lib to'liq to'lanadi
+            total = sum(schedule.get_total_amount(now) for schedule in schedules)
+            parts = min(len(schedules), rng.randint(1, 4))
+            amounts = [(total / parts).quantize(Decimal('0.01'))] * (parts - 1)
+            amounts.append(total - sum(amounts))
+        else:
+            # Faol ijara: muddati o'tgan jadvallarning bir qismi to'lanadi, ba'zilari qarzdor qoladi
+            overdue = sum(1 for schedule in schedules if schedule.due_date <= now)
+            paid = max(overdue - rng.choice([0, 0, 0, 1, 2, 3]), 0)
+            amounts = [rental.rent_amount] * paid
+            if amounts and rng.random() < 0.3:
+                amounts[-1] = (rental.rent_amount / 2).quantize(Decimal('0.01'))
+
+        for amount in amounts:
+            Payment.objects.create(rental=rental, employee=rental.employee, amount=amount)
+        return len(amounts)
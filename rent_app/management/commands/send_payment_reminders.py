@@ -1,14 +1,18 @@
 from datetime import datetime
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-from rent_app.models import PaymentSchedule
-from rent_app.utils import send_sms
+from rent_app.models import PaymentSchedule, ReminderLog
+from rent_app.utils import send_many
 
 import locale
 locale.setlocale(locale.LC_ALL, '')
 
+REMINDER_KIND = 'due_today'
+REMINDER_CHUNK_SIZE = 200
+
 
 def format_currency(value):
     try:
@@ -28,8 +32,19 @@ def format_date(date_str):
 class Command(BaseCommand):
     help = 'Send SMS reminders for payment schedules due today'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.SMS_REMINDER_WORKERS,
+                            help='Number of concurrent SMS senders')
+        parser.add_argument('--rate', type=float, default=settings.SMS_REMINDER_RATE_LIMIT,
+                            help='Maximum messages per second (0 - unlimited)')
+        parser.add_argument('--min-id', type=int, default=None, help='Smallest payment schedule id of this shard')
+        parser.add_argument('--max-id', type=int, default=None, help='Largest payment schedule id of this shard')
+        parser.add_argument('--chunk-size', type=int, default=REMINDER_CHUNK_SIZE,
+                            help='Number of reminders sent before they are written to the log')
+
+    def handle(self, *args, **options):
         now = timezone.now()
+        today = timezone.localdate(now)
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
 
@@ -38,10 +53,48 @@ class Command(BaseCommand):
             due_date__gte=today_start,
             due_date__lte=today_end,
             is_paid=False
-        )
+        ).select_related('rental').order_by('id')
+        if options['min_id'] is not None:
+            due_payments = due_payments.filter(id__gte=options['min_id'])
+        if options['max_id'] is not None:
+            due_payments = due_payments.filter(id__lte=options['max_id'])
+
+        due_payments = list(due_payments)
+        sent, failed, skipped = 0, 0, 0
+        for i in range(0, len(due_payments), options['chunk_size']):
+            chunk = due_payments[i:i + options['chunk_size']]
+
+            # Oldin yuborilganlarini bitta so'rov bilan aniqlaymiz
+            already_sent = set(ReminderLog.objects.filter(
+                payment_schedule_id__in=[payment.id for payment in chunk],
+                kind=REMINDER_KIND,
+                reminder_date=today,
+            ).values_list('payment_schedule_id', flat=True))
+            pending = [payment for payment in chunk if payment.id not in already_sent]
+            skipped += len(chunk) - len(pending)
+
+            messages = [
+                (payment.rental.phone,
+                 f"Xurmatli {payment.rental.fullname}.\n"
+                 f"Siz {format_currency(payment.amount)} so'm miqdoridagi to'lovingizni {format_date(payment.due_date)} gacha to'lanishi kerak.")
+                for payment in pending
+            ]
+            results = send_many(messages, workers=options['workers'], rate=options['rate'])
+
+            logs = []
+            for payment, result in zip(pending, results):
+                # fail_silently=True bo'lsa xato yutiladi, lekin sid bo'lmaydi: SMS yuborilmagan
+                if result.error is not None or result.sid is None:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(
+                        f"Failed to send reminder for schedule {payment.id} to {result.phone}: "
+                        f"{result.error or 'no message sid returned'}"))
+                else:
+                    sent += 1
+                    logs.append(ReminderLog(payment_schedule=payment, kind=REMINDER_KIND, reminder_date=today,
+                                            sid=result.sid))
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Sent reminder for schedule {payment.id} to {result.phone} ({result.sid})"))
+            ReminderLog.objects.bulk_create(logs, ignore_conflicts=True)
 
-        for payment in due_payments:
-            message = (f"Xurmatli {payment.rental.fullname}.\n"
-                       f"Siz {format_currency(payment.amount)} so'm miqdoridagi to'lovingizni {format_date(payment.due_date)} gacha to'lanishi kerak.")
-            send_sms(payment.rental.phone, message)
-            self.stdout.write(self.style.SUCCESS(f"Sent reminder to {payment.rental.phone}"))
+        self.stdout.write(f"Reminders sent: {sent}, failed: {failed}, already sent: {skipped}")
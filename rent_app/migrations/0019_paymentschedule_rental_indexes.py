@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 15:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car_app', '0008_alter_car_tech_passport_image_back_and_more'),
+        ('rent_app', '0018_rental_payment_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['is_paid', 'payment_date'], name='payment_sch_unpaid_paydate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['is_paid', 'due_date'], name='payment_sch_unpaid_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(fields=['rental', 'is_paid', 'due_date'], name='payment_sch_rental_unpaid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['is_active', 'bad_rental', '-start_date'], name='rental_active_bad_start_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rent_app', '0019_paymentschedule_rental_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('due_today', 'Due today')], default='due_today', max_length=20)),
+                ('reminder_date', models.DateField()),
+                ('sid', models.CharField(blank=True, max_length=64, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_logs', to='rent_app.paymentschedule')),
+            ],
+            options={
+                'db_table': 'reminder_logs',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reminderlog',
+            constraint=models.UniqueConstraint(fields=('payment_schedule', 'kind', 'reminder_date'), name='unique_reminder_per_schedule_kind_date'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.0.7 on 2026-10-18 15:43
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_balances(apps, schema_editor):
+    Rental = apps.get_model('rent_app', 'Rental')
+    PaymentSchedule = apps.get_model('rent_app', 'PaymentSchedule')
+    schedules = PaymentSchedule.objects.filter(rental=OuterRef('pk')).order_by().values('rental')
+
+    def total(expression, **filters):
+        return Coalesce(
+            Subquery(schedules.filter(**filters).annotate(total=Sum(expression)).values('total')),
+            Value(Decimal('0.0')),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+
+    Rental.objects.update(
+        scheduled_total=total('amount'),
+        paid_total=total('amount_paid'),
+        penalty_total=total('penalty_amount'),
+        outstanding_amount=total(F('amount') + F('penalty_amount') - F('amount_paid')),
+        unpaid_count=Coalesce(
+            Subquery(schedules.filter(is_paid=False).annotate(count=Count('id')).values('count')), Value(0)
+        ),
+        next_due_date=Subquery(
+            PaymentSchedule.objects.filter(rental=OuterRef('pk'), is_paid=False).order_by('due_date')
+            .values('due_date')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car_app', '0008_alter_car_tech_passport_image_back_and_more'),
+        ('rent_app', '0020_reminderlog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rental',
+            name='next_due_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='outstanding_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.0'), editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='paid_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.0'), editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='penalty_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.0'), editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='scheduled_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.0'), editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='unpaid_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['is_active', '-outstanding_amount'], name='rental_active_outstanding_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['is_active', 'next_due_date'], name='rental_active_next_due_idx'),
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,10 @@ from datetime import timedelta, datetime
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from rest_framework.exceptions import ValidationError
@@ -11,6 +14,19 @@ from car_app.models import Car
 
 employee_model = get_user_model()
 
+# To'lov jadvali bulk_create/bulk_update orqali yozilganda post_save ishlamaydi,
+# shuning uchun butun paket uchun tranzaksiya yakunlangach bitta signal yuboriladi
+payment_schedules_created = Signal()
+payment_schedules_updated = Signal()
+
+SCHEDULE_BATCH_SIZE = 500
+
+# To'lov jadvalidan hisoblanib Rental'da saqlanadigan qoldiqlar
+BALANCE_FIELDS = ['scheduled_total', 'paid_total', 'penalty_total', 'outstanding_amount', 'next_due_date',
+                  'unpaid_count']
+# Shu maydonlar o'zgarganda ijara qoldiqlari qayta hisoblanadi
+SCHEDULE_BALANCE_FIELDS = {'rental', 'amount', 'amount_paid', 'penalty_amount', 'is_paid', 'due_date'}
+
 RENT_TYPES = (
     ('daily', 'Daily'),
     ('monthly', 'Monthly'),
@@ -18,12 +34,74 @@ RENT_TYPES = (
 )
 
 
+def calculate_penalty(rent_type, penalty_rate, due_date, payment_date, current_date) -> Decimal:
+    """
+    Jarimani hisoblaydi: kunlik ijarada har soat, oylik ijarada har kun uchun, nasiyada jarima yo'q
+    """
+    overdue_time = current_date - due_date
+    penalty = Decimal('0.0')
+
+    if rent_type != 'credit' and overdue_time.total_seconds() > 0:
+        if rent_type == 'monthly':
+            overdue_days = (current_date.date() - payment_date).days
+            penalty = penalty_rate * overdue_days
+        elif rent_type == 'daily':
+            overdue_hours = overdue_time.total_seconds() // 3600
+            penalty = penalty_rate * Decimal(int(overdue_hours))
+
+    return Decimal(penalty)
+
+
 class ActivePaymentScheduleManager(models.Manager):
     def get_queryset(self):
         return super().get_queryset().filter(is_paid=False)
 
 
-class ActiveRentalManager(models.Manager):
+def balance_expressions():
+    """
+    Ijara qoldiqlarini to'lov jadvalidan hisoblaydigan korrelyatsiyalangan subquery'lar
+    """
+    schedules = PaymentSchedule.objects.filter(rental=OuterRef('pk')).order_by().values('rental')
+    money_field = DecimalField(max_digits=14, decimal_places=2)
+
+    def total(expression, **filters):
+        return Coalesce(
+            Subquery(schedules.filter(**filters).annotate(total=Sum(expression)).values('total')),
+            Value(Decimal('0.0')),
+            output_field=money_field,
+        )
+
+    return {
+        'scheduled_total': total('amount'),
+        'paid_total': total('amount_paid'),
+        'penalty_total': total('penalty_amount'),
+        'outstanding_amount': total(F('amount') + F('penalty_amount') - F('amount_paid')),
+        'unpaid_count': Coalesce(
+            Subquery(schedules.filter(is_paid=False).annotate(count=Count('id')).values('count')), Value(0)
+        ),
+        'next_due_date': Subquery(
+            PaymentSchedule.objects.filter(rental=OuterRef('pk'), is_paid=False).order_by('due_date')
+            .values('due_date')[:1]
+        ),
+    }
+
+
+class RentalQuerySet(models.QuerySet):
+    def refresh_balances(self):
+        """
+        Qoldiq ustunlarini to'lov jadvalidan bitta UPDATE bilan qayta hisoblaydi.
+        Jadval o'zgargan tranzaksiya ichida chaqiriladi.
+        """
+        return self.update(**balance_expressions())
+
+    def with_expected_balances(self):
+        """
+        Saqlangan qoldiqlarni tekshirish uchun to'lov jadvalidan hisoblangan qiymatlar: expected_<ustun>
+        """
+        return self.annotate(**{f'expected_{name}': expression for name, expression in balance_expressions().items()})
+
+
+class ActiveRentalManager(models.Manager.from_queryset(RentalQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(is_active=True)
 
@@ -48,82 +126,78 @@ class PaymentSchedule(models.Model):
 
     class Meta:
         ordering = ['due_date']
-
-    def calculate_payment(self):
+        # Qisman indekslar MySQL'da shartsiz composite indeks sifatida yaratiladi,
+        # shuning uchun is_paid birinchi ustun bo'lib turadi
+        indexes = [
+            models.Index(fields=['is_paid', 'payment_date'], condition=models.Q(is_paid=False),
+                         name='payment_sch_unpaid_paydate_idx'),
+            models.Index(fields=['is_paid', 'due_date'], condition=models.Q(is_paid=False),
+                         name='payment_sch_unpaid_due_idx'),
+            models.Index(fields=['rental', 'is_paid', 'due_date'], name='payment_sch_rental_unpaid_idx'),
+        ]
+
+    def calculate_payment(self, now=None, commit=False):
         """
         To'lov miqdorini hisoblaydi, agar jarima qo'llanilishi kerak bo'lsa, uni ham hisoblaydi.
+        Jarima faqat commit=True bo'lganda bazaga yoziladi (update_fields bilan).
         """
         if self.is_paid:
             return self.amount
 
-        # Jarimani hisoblash
-        current_date = timezone.now()
-        overdue_time = current_date - self.due_date
-        penalty = Decimal('0.0')
-
-        if self.rental.rent_type != 'credit' and overdue_time.total_seconds() > 0:
-            penalty_rate = self.rental.penalty_amount
-            if self.rental.rent_type == 'monthly':
-                overdue_days = (current_date.date() - self.payment_date).days
-                penalty = penalty_rate * overdue_days
-            elif self.rental.rent_type == 'daily':
-                overdue_hours = overdue_time.total_seconds() // 3600
-                penalty = penalty_rate * overdue_hours
-
-        total_payment = self.amount + penalty - self.amount_paid
-        self.penalty_amount = penalty
-        self.save()
-        return total_payment
-
-    def make_payment(self, payment_amount):
+        penalty = self.get_percentage_amount(now)
+        if commit:
+            self.penalty_amount = penalty
+            self.save(update_fields=['penalty_amount'])
+        return self.amount + penalty - self.amount_paid
+
+    def make_payment(self, payment_amount, now=None):
         """
         To'lovni amalga oshirish va tegishli maydonlarni yangilash.
         """
-        total_payment = self.calculate_payment()
+        now = now or timezone.now()
+        total_payment = self.calculate_payment(now)
         excess_amount = Decimal('0.0')
 
+        if not self.is_paid:
+            self.penalty_amount = self.get_percentage_amount(now)
+
         if payment_amount >= total_payment:
             self.amount_paid += total_payment
             excess_amount = payment_amount - total_payment
             self.is_paid = True
-            self.paid_date = timezone.now()
-            self.payment_closing_date = timezone.now()
+            self.paid_date = now
+            self.payment_closing_date = now
         else:
             self.amount_paid += payment_amount
-            self.paid_date = timezone.now()
+            self.paid_date = now
 
-        self.save()
+        self.save(update_fields=['penalty_amount', 'amount_paid', 'is_paid', 'paid_date', 'payment_closing_date'])
         return excess_amount
 
-    def get_percentage_amount(self) -> Decimal:
+    def get_percentage_amount(self, now=None) -> Decimal:
         """
-        To'lov jarimasini hisoblaydi
+        To'lov jarimasini hisoblaydi. Natija obyekt ichida "now" bo'yicha keshlanadi,
+        now berilmasa oldingi hisoblangan qiymat qaytariladi.
         """
         if self.is_paid:
             return Decimal('0.0')
 
-        # Jarimani hisoblash
-        current_date = timezone.now()
-        overdue_time = current_date - self.due_date
-        penalty = Decimal('0.0')
-
-        if self.rental.rent_type != 'credit' and overdue_time.total_seconds() > 0:
-            penalty_rate = self.rental.penalty_amount
-            if self.rental.rent_type == 'monthly':
-                overdue_days = (current_date.date() - self.payment_date).days
-                penalty = penalty_rate * overdue_days
-            elif self.rental.rent_type == 'daily':
-                overdue_hours = overdue_time.total_seconds() // 3600
-                penalty = penalty_rate * overdue_hours
+        cached = self.__dict__.get('_penalty_cache')
+        if cached is not None and (now is None or cached[0] == now):
+            return cached[1]
 
-        return Decimal(penalty)
+        current_date = now or timezone.now()
+        penalty = calculate_penalty(self.rental.rent_type, self.rental.penalty_amount, self.due_date,
+                                    self.payment_date, current_date)
+        self._penalty_cache = (current_date, penalty)
+        return penalty
 
-    def get_total_amount(self) -> Decimal:
+    def get_total_amount(self, now=None) -> Decimal:
         """
         Umumiy to'lanishi kerak summasi
         :return:
         """
-        total_amount = self.amount + self.get_percentage_amount() - self.amount_paid
+        total_amount = self.amount + self.get_percentage_amount(now) - self.amount_paid
         return Decimal(total_amount)
 
 
@@ -173,8 +247,15 @@ class Rental(models.Model):
     closing_date = models.DateField(null=True, blank=True)
     bad_rental = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
-
-    objects = models.Manager()
+    # To'lov jadvali qoldiqlari: faqat refresh_balances() orqali yangilanadi
+    scheduled_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.0'), editable=False)
+    paid_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.0'), editable=False)
+    penalty_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.0'), editable=False)
+    outstanding_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.0'), editable=False)
+    next_due_date = models.DateTimeField(null=True, blank=True, editable=False)
+    unpaid_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = models.Manager.from_queryset(RentalQuerySet)()
     active_objects = ActiveRentalManager()
 
     def __str__(self):
@@ -183,16 +264,19 @@ class Rental(models.Model):
     class Meta:
         db_table = 'rentals'
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['is_active', 'bad_rental', '-start_date'], name='rental_active_bad_start_idx'),
+            models.Index(fields=['is_active', '-outstanding_amount'], name='rental_active_outstanding_idx'),
+            models.Index(fields=['is_active', 'next_due_date'], name='rental_active_next_due_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Qoldiqlar bazada yangilanadi, eski obyekt ularni qayta yozib yubormasligi kerak
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in BALANCE_FIELDS]
         if not self.pk:
             self.start_date = timezone.now()
-            if self.car.status == 'active':
-                self.car.status = 'rented'
-                self.car.save()
-            else:
-                raise ValidationError(detail="Bu mashina faol emas. Allaqachon ijaraga berilgan", code=400)
-
             rent_hour = self.start_date.hour
             if self.rent_type == 'daily':
                 self.end_date = self.start_date + timedelta(days=self.rent_period)
@@ -201,13 +285,64 @@ class Rental(models.Model):
                 self.end_date = (self.start_date.replace(hour=rent_hour + 1, minute=0, second=0, microsecond=0) +
                                  relativedelta(months=self.rent_period))
 
-        super().save(*args, **kwargs)
-
-        if not PaymentSchedule.objects.filter(rental=self).exists():
-            if self.rent_type == 'daily':
-                self.create_payment_day_schedule()
-            elif self.rent_type in ['monthly', 'credit']:
-                self.create_payment_schedule()
+        with transaction.atomic():
+            if self._state.adding:
+                self.take_car()
+            super().save(*args, **kwargs)
+
+            if not PaymentSchedule.objects.filter(rental=self).exists():
+                if self.rent_type == 'daily':
+                    schedules = self.create_payment_day_schedule()
+                elif self.rent_type in ['monthly', 'credit']:
+                    schedules = self.create_payment_schedule()
+                else:
+                    schedules = []
+                if schedules:
+                    self.refresh_balance()
+                    transaction.on_commit(
+                        lambda: payment_schedules_created.send(sender=PaymentSchedule, rental=self,
+                                                               schedules=schedules)
+                    )
+
+    def take_car(self):
+        """
+        Mashinani shartli UPDATE bilan ijaraga oladi: bir vaqtda ikki xodim bitta mashinani ijaraga bera olmaydi
+        """
+        updated = Car.objects.filter(pk=self.car_id, status='active', is_active=True).update(
+            status='rented', updated_at=timezone.now()
+        )
+        if not updated:
+            raise ValidationError(detail="Bu mashina faol emas. Allaqachon ijaraga berilgan", code=400)
+        self.car.status = 'rented'
+
+    def close(self, closing_date=None):
+        """
+        Ijarani yopadi va mashinani bo'shatadi (nasiya savdoda mashina sotilgan bo'ladi).
+        Holatlar shartli UPDATE bilan o'zgartiriladi; ijara allaqachon yopilgan bo'lsa hech narsa qilmay False qaytaradi.
+        """
+        from rent_app.utils.dashboard_cache import invalidate_dashboard_cache
+
+        now = timezone.now()
+        closing_date = closing_date or now.date()
+        with transaction.atomic():
+            if not Rental.objects.filter(pk=self.pk, is_active=True).update(is_active=False,
+                                                                             closing_date=closing_date):
+                return False
+            if self.rent_type != 'credit':
+                car_fields = {'status': 'active'}
+                Car.objects.filter(pk=self.car_id, status='rented').update(updated_at=now, **car_fields)
+            else:
+                car_fields = {'status': 'sold', 'is_active': False}
+                Car.objects.filter(pk=self.car_id).update(updated_at=now, **car_fields)
+            # queryset.update() signal yubormaydi
+            transaction.on_commit(invalidate_dashboard_cache)
+
+        self.is_active = False
+        self.closing_date = closing_date
+        if Rental.car.is_cached(self):
+            for name, value in car_fields.items():
+                setattr(self.car, name, value)
+        return True
 
     def create_payment_schedule(self):
         if self.rent_type == 'credit' and self.payment_date:
@@ -219,45 +354,75 @@ class Rental(models.Model):
             rent_hour = self.start_date.hour
             current_date = self.start_date.replace(hour=rent_hour + 1, minute=0, second=0, microsecond=0)
 
+        schedules = []
         for _ in range(self.rent_period):
-            PaymentSchedule.objects.create(
+            schedules.append(PaymentSchedule(
                 rental=self,
                 due_date=current_date,
                 payment_date=current_date.date(),
                 amount=self.rent_amount
-            )
+            ))
             current_date = current_date + relativedelta(months=1)
+        return self._bulk_create_schedules(schedules)
 
     def create_payment_day_schedule(self):
         rent_hour = self.start_date.hour
         current_date = self.start_date.replace(hour=rent_hour + 1, minute=0, second=0, microsecond=0)
+        schedules = []
         for _ in range(self.rent_period):
             due_date = current_date + relativedelta(days=1)
-            PaymentSchedule.objects.create(
+            schedules.append(PaymentSchedule(
                 rental=self,
                 due_date=due_date,
                 payment_date=due_date.date(),
                 amount=self.rent_amount
-            )
+            ))
             current_date = due_date
+        return self._bulk_create_schedules(schedules)
+
+    @staticmethod
+    def _bulk_create_schedules(schedules):
+        """
+        To'lov jadvalini bitta tranzaksiyada paketlab yozadi
+        """
+        with transaction.atomic():
+            return PaymentSchedule.objects.bulk_create(schedules, batch_size=SCHEDULE_BATCH_SIZE)
+
+    def refresh_balance(self):
+        """
+        Qoldiqlarni bazada qayta hisoblab, obyektga ham yuklaydi
+        """
+        Rental.objects.filter(pk=self.pk).refresh_balances()
+        self.refresh_from_db(fields=BALANCE_FIELDS)
 
     def get_total_amount(self):
-        payment_schedules = PaymentSchedule.objects.filter(rental=self)
-        total_amount = Decimal('0.0')
-        for payment_schedule in payment_schedules:
-            total_amount += (payment_schedule.amount + payment_schedule.penalty_amount - payment_schedule.amount_paid)
-        return total_amount
+        return self.outstanding_amount
 
     def get_total_paid_amount(self):
-        payment_schedules = PaymentSchedule.objects.filter(rental=self)
-        total_amount = Decimal('0.0')
-        for payment_schedule in payment_schedules:
-            total_amount += payment_schedule.amount_paid
-        return total_amount
+        return self.paid_total
 
     def get_amount(self):
-        payment_schedules = PaymentSchedule.objects.filter(rental=self)
-        total_amount = Decimal('0.0')
-        for payment_schedule in payment_schedules:
-            total_amount += payment_schedule.amount
-        return total_amount
+        return self.scheduled_total
+
+
+REMINDER_KINDS = (
+    ('due_today', 'Due today'),
+)
+
+
+class ReminderLog(models.Model):
+    payment_schedule = models.ForeignKey(PaymentSchedule, on_delete=models.CASCADE, related_name='reminder_logs')
+    kind = models.CharField(max_length=20, choices=REMINDER_KINDS, default='due_today')
+    reminder_date = models.DateField()
+    sid = models.CharField(max_length=64, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} reminder for schedule {self.payment_schedule_id} on {self.reminder_date}"
+
+    class Meta:
+        db_table = 'reminder_logs'
+        constraints = [
+            models.UniqueConstraint(fields=['payment_schedule', 'kind', 'reminder_date'],
+                                    name='unique_reminder_per_schedule_kind_date'),
+        ]
@@ -32,10 +32,10 @@ class PaymentScheduleListSerializer(serializers.ModelSerializer):
                   'due_date', 'is_paid']
 
     def get_total_amount(self, obj) -> Decimal:
-        return obj.get_total_amount()
+        return obj.get_total_amount(self.context.get('now'))
 
     def get_percentage_amount(self, obj) -> Decimal:
-        return obj.get_percentage_amount()
+        return obj.get_percentage_amount(self.context.get('now'))
 
     def get_rent_type(self, obj):
         return obj.rental.rent_type
@@ -61,7 +61,7 @@ class ActiveRentalListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rental
         fields = ['id', 'employee', 'fullname', 'phone', 'start_date', 'end_date', 'rent_type', 'currency',
-                  'total_amount', 'car']
+                  'total_amount', 'next_due_date', 'unpaid_count', 'car']
 
     def get_total_amount(self, obj) -> Decimal:
         return obj.get_total_amount()
@@ -136,10 +136,10 @@ class PaymentScheduleListForRentalSerializer(serializers.ModelSerializer):
                   'is_paid']
 
     def get_penalty_amount(self, obj) -> Decimal:
-        return obj.get_percentage_amount()
+        return obj.get_percentage_amount(self.context.get('now'))
 
     def get_total_amount(self, obj) -> Decimal:
-        return obj.get_total_amount()
+        return obj.get_total_amount(self.context.get('now'))
 
 
 class RentalRetrieveSerializer(serializers.ModelSerializer):
@@ -160,7 +160,7 @@ class RentalRetrieveSerializer(serializers.ModelSerializer):
                   'total_paid_amount']
 
     def get_payment_schedules(self, obj):
-        return PaymentScheduleListForRentalSerializer(obj.payment_schedule.all(), many=True).data
+        return PaymentScheduleListForRentalSerializer(obj.payment_schedule.all(), many=True, context=self.context).data
 
     def get_amount(self, obj) -> Decimal:
         return obj.get_amount()
@@ -169,11 +169,7 @@ class RentalRetrieveSerializer(serializers.ModelSerializer):
         return obj.get_total_amount()
 
     def get_total_penalty_amount(self, obj) -> Decimal:
-        payment_schodules = obj.payment_schedule.all()
-        total_penalty_amount = Decimal('0.0')
-        for payment_schedule in payment_schodules:
-            total_penalty_amount += payment_schedule.penalty_amount
-        return total_penalty_amount
+        return obj.penalty_total
 
     def get_paid_amount(self, obj) -> Decimal:
         return obj.get_total_paid_amount()
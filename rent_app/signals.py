@@ -1,22 +1,46 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from rest_framework.renderers import JSONRenderer
-from .models import PaymentSchedule
-from .serializers import PaymentScheduleListSerializer
+from .models import (SCHEDULE_BALANCE_FIELDS, PaymentSchedule, Rental, payment_schedules_created,
+                     payment_schedules_updated)
+from .utils import invalidate_dashboard_cache, notify_schedules_changed, notify_schedules_removed
 
 
 @receiver(post_save, sender=PaymentSchedule)
 def send_payment_schedule_update(sender, instance, **kwargs):
-    channel_layer = get_channel_layer()
-    serializer = PaymentScheduleListSerializer(instance)
-    serialized_data = JSONRenderer().render(serializer.data)
-
-    async_to_sync(channel_layer.group_send)(
-        'payment_schedules',
-        {
-            'type': 'send_update',
-            'data': serialized_data.decode('utf-8')
-        }
-    )
+    notify_schedules_changed([instance.pk])
+
+
+@receiver(post_delete, sender=PaymentSchedule)
+def send_payment_schedule_removed(sender, instance, **kwargs):
+    notify_schedules_removed([instance])
+
+
+@receiver([post_save, post_delete], sender=PaymentSchedule)
+def refresh_rental_balance(sender, instance, update_fields=None, **kwargs):
+    # Saqlash bilan bir tranzaksiyada; qoldiqqa ta'sir qilmaydigan maydonlar saqlansa o'tkazib yuboriladi
+    if update_fields is not None and not SCHEDULE_BALANCE_FIELDS.intersection(update_fields):
+        return
+    Rental.objects.filter(pk=instance.rental_id).refresh_balances()
+
+
+@receiver(payment_schedules_created, sender=PaymentSchedule)
+def send_payment_schedules_created(sender, rental, schedules, **kwargs):
+    schedule_ids = [schedule.pk for schedule in schedules]
+    if None in schedule_ids:
+        # bulk_create MySQL'da id qaytarmaydi
+        schedule_ids = PaymentSchedule.objects.filter(rental=rental).values_list('id', flat=True)
+    notify_schedules_changed(schedule_ids)
+
+
+@receiver(payment_schedules_updated, sender=PaymentSchedule)
+def send_payment_schedules_updated(sender, schedules, **kwargs):
+    notify_schedules_changed([schedule.pk for schedule in schedules])
+
+
+@receiver([post_save, post_delete], sender=PaymentSchedule)
+@receiver([post_save, post_delete], sender=Rental)
+@receiver([payment_schedules_created, payment_schedules_updated], sender=PaymentSchedule)
+def invalidate_dashboard(sender, **kwargs):
+    # Tranzaksiya yakunlanmasdan kesh o'chirilsa, eski ma'lumot qayta keshlanib qolishi mumkin
+    transaction.on_commit(invalidate_dashboard_cache)
@@ -1,3 +1,600 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from car_app.models import Car
+from payment.models import Payment, PaymentAllocation
+from rent_app.consumers import PaymentScheduleConsumer
+from rent_app.models import PaymentSchedule, ReminderLog, Rental
+from rent_app.serializers import RentalRetrieveSerializer
+from rent_app.utils import accrue_penalties, dashboard_cache_key, get_connection, pdf_writer, send_many, send_sms
+from rent_app.utils.schedule_broadcast import (broadcast_schedules, build_snapshot, get_events_since,
+                                               notify_schedules_changed)
+from rent_app.utils.sms_backends import base as sms_base, locmem
+from rent_app.utils.sms_backends.base import BaseSMSBackend, RateLimiter, SMSResult
+
+employee_model = get_user_model()
+# rent_app.utils paketidagi pdf_writer funksiyasi modul nomini yopib qo'yadi
+pdf_writer_module = importlib.import_module('rent_app.utils.pdf_writer')
+
+
+class PaymentScheduleIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        employee = employee_model.objects.create(username='employee')
+        for i, rent_type in enumerate(['daily', 'monthly', 'credit']):
+            car = Car.objects.create(employee=employee, name='Car', car_number=f'01A{i}00AA', tech_passport_number='1')
+            Rental.objects.create(employee=employee, car=car, fullname='Client', phone='+998900000000',
+                                  passport='AA0000000', rent_type=rent_type, rent_amount=Decimal('100.00'),
+                                  rent_period=30)
+
+    def test_dashboard_query_uses_unpaid_payment_date_index(self):
+        today = timezone.localdate()
+        queryset = PaymentSchedule.active_objects.filter(
+            rental__rent_type='daily', payment_date__lte=today + timedelta(days=2)
+        ).select_related('rental', 'rental__car').order_by('due_date', 'id')
+        self.assertIn('payment_sch_unpaid_paydate_idx', queryset.explain())
+
+    def test_reminder_query_uses_unpaid_due_date_index(self):
+        now = timezone.now()
+        queryset = PaymentSchedule.objects.filter(
+            due_date__gte=now.replace(hour=0, minute=0, second=0, microsecond=0),
+            due_date__lte=now.replace(hour=23, minute=59, second=59, microsecond=999999),
+            is_paid=False
+        )
+        self.assertIn('payment_sch_unpaid_due_idx', queryset.explain())
+
+
+class SuccessfullyPaidTestCase(TestCase):
+    def setUp(self):
+        self.employee = employee_model.objects.create(username='employee')
+        car = Car.objects.create(employee=self.employee, name='Car', car_number='01A000AA', tech_passport_number='1')
+        self.rental = Rental.objects.create(employee=self.employee, car=car, fullname='Client',
+                                            phone='+998900000000', passport='AA0000000', rent_type='daily',
+                                            rent_amount=Decimal('100.00'), penalty_amount=Decimal('10.00'),
+                                            rent_period=2)
+        # Muddati o'tgan jadvallarga tungi jarima yoziladi
+        past = timezone.now() - timedelta(days=3)
+        PaymentSchedule.objects.filter(rental=self.rental).update(due_date=past, payment_date=past.date())
+        accrue_penalties()
+        self.client.force_login(self.employee)
+
+    def assertLedgerMatchesSchedules(self):
+        allocated = (PaymentAllocation.objects.filter(schedule=OuterRef('pk')).order_by().values('schedule')
+                     .annotate(total=Sum('amount')).values('total'))
+        schedules = PaymentSchedule.objects.filter(rental=self.rental).annotate(
+            allocated=Coalesce(Subquery(allocated), Value(Decimal('0.0')), output_field=DecimalField()))
+        for schedule in schedules:
+            self.assertEqual(schedule.allocated, schedule.amount_paid)
+
+    def test_waived_penalty_leaves_no_outstanding_amount(self):
+        self.rental.refresh_from_db()
+        self.assertGreater(self.rental.penalty_total, Decimal('0.0'))
+
+        for schedule in PaymentSchedule.objects.filter(rental=self.rental):
+            response = self.client.post(f'/api/v1/rentals/successfully_paid/?payment_id={schedule.id}')
+            self.assertEqual(response.status_code, 200)
+
+        self.rental.refresh_from_db()
+        self.assertFalse(self.rental.is_active)
+        self.assertEqual(self.rental.outstanding_amount, Decimal('0.0'))
+        self.assertEqual(self.rental.penalty_total, Decimal('0.0'))
+        self.assertEqual(self.rental.paid_total, self.rental.scheduled_total)
+        self.assertLedgerMatchesSchedules()
+        self.assertEqual(PaymentAllocation.objects.filter(payment=None).count(), 2)
+
+    def test_paid_part_of_penalty_is_kept(self):
+        payment = Payment.objects.create(rental=self.rental, employee=self.employee, amount=Decimal('110.00'))
+        schedule = PaymentAllocation.objects.get(payment=payment).schedule
+
+        response = self.client.post(f'/api/v1/rentals/successfully_paid/?payment_id={schedule.id}')
+
+        self.assertEqual(response.status_code, 200)
+        schedule.refresh_from_db()
+        self.assertTrue(schedule.is_paid)
+        self.assertEqual(schedule.amount_paid, Decimal('110.00'))
+        self.assertEqual(schedule.penalty_amount, Decimal('10.00'))
+        self.assertIsNotNone(schedule.payment_closing_date)
+        self.rental.refresh_from_db()
+        self.assertEqual(self.rental.paid_total, Decimal('110.00'))
+        self.assertEqual(self.rental.outstanding_amount,
+                         PaymentSchedule.active_objects.get(rental=self.rental).penalty_amount + Decimal('100.00'))
+        # Asosiy summa Payment orqali to'langan: daftarga qo'shimcha yozuv tushmaydi
+        self.assertFalse(PaymentAllocation.objects.filter(payment=None).exists())
+        self.assertLedgerMatchesSchedules()
+
+
+class DashboardCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = employee_model.objects.create(username='employee')
+        car = Car.objects.create(employee=self.employee, name='Car', car_number='01A000AA', tech_passport_number='1')
+        self.rental = Rental.objects.create(employee=self.employee, car=car, fullname='Client',
+                                            phone='+998900000000', passport='AA0000000', rent_type='daily',
+                                            rent_amount=Decimal('100.00'), penalty_amount=Decimal('10.00'),
+                                            rent_period=3)
+        self.schedule = PaymentSchedule.objects.filter(rental=self.rental).order_by('due_date').first()
+        self.cache_key = dashboard_cache_key('daily', timezone.localdate())
+        self.client.force_login(self.employee)
+
+    def dashboard_schedules(self):
+        response = self.client.get('/api/v1/rentals/dashboard/', {'rent_type': 'daily'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(cache.get(self.cache_key))
+        return {schedule['id']: schedule for bucket in response.json() for schedule in bucket['payment_schedules']}
+
+    def test_schedule_change_refreshes_dashboard(self):
+        self.assertEqual(self.dashboard_schedules()[self.schedule.id]['amount_paid'], '0.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.schedule.amount_paid = Decimal('50.00')
+            self.schedule.save(update_fields=['amount_paid'])
+
+        self.assertEqual(self.dashboard_schedules()[self.schedule.id]['amount_paid'], '50.00')
+
+    def test_payment_refreshes_dashboard(self):
+        self.assertIn(self.schedule.id, self.dashboard_schedules())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(rental=self.rental, employee=self.employee, amount=Decimal('100.00'))
+
+        self.assertNotIn(self.schedule.id, self.dashboard_schedules())
+
+    def test_penalty_accrual_clears_cache(self):
+        PaymentSchedule.objects.filter(id=self.schedule.id).update(due_date=timezone.now() - timedelta(hours=3))
+        self.dashboard_schedules()
+
+        accrue_penalties()
+
+        self.assertIsNone(cache.get(self.cache_key))
+
+    def test_rental_close_clears_cache(self):
+        self.dashboard_schedules()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.rental.close())
+
+        self.assertIsNone(cache.get(self.cache_key))
+
+class ContractPDFTestCase(TestCase):
+    def setUp(self):
+        employee = employee_model.objects.create(username='employee')
+        car = Car.objects.create(employee=employee, name='Car', car_number='01A000AA', tech_passport_number='1')
+        rental = Rental.objects.create(employee=employee, car=car, fullname='Client', phone='+998900000000',
+                                       passport='AA0000000', rent_type='daily', rent_amount=Decimal('100.00'),
+                                       rent_period=2)
+        self.data = RentalRetrieveSerializer(rental, context={'now': timezone.now()}).data
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(pdf_writer_module, 'CONTRACTS_DIRECTORY', directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returned_file_survives_newer_version(self):
+        first = pdf_writer(self.data)
+        self.addCleanup(first.close)
+        # Jarima o'zgarib, boshqa so'rov yangi versiyani yaratadi va eskisini o'chiradi
+        newer = pdf_writer(dict(self.data, total_penalty_amount='1.00'))
+        newer.close()
+
+        self.assertTrue(first.read().startswith(b'%PDF'))
+
+    def test_unchanged_contract_is_served_from_disk(self):
+        with pdf_writer(self.data) as first, mock.patch.object(pdf_writer_module, 'render_pdf') as render:
+            with pdf_writer(self.data) as second:
+                self.assertEqual(first.name, second.name)
+        render.assert_not_called()
+
+
+class ExportContractsTestCase(TransactionTestCase):
+    """
+    Eksport PDF'larni alohida jarayonlarda yaratadi va undan oldin bazaga ulanishlarni yopadi,
+    shuning uchun testlar tranzaksiya ichida bajarilmaydi
+    """
+
+    def setUp(self):
+        self.admin = employee_model.objects.create(username='admin', is_staff=True)
+        self.rental_ids = []
+        for number in range(2):
+            car = Car.objects.create(employee=self.admin, name='Car', car_number=f'01A00{number}AA',
+                                     tech_passport_number=str(number))
+            rental = Rental.objects.create(employee=self.admin, car=car, fullname='Client', phone='+998900000000',
+                                           passport='AA0000000', rent_type='daily', rent_amount=Decimal('100.00'),
+                                           rent_period=2)
+            self.rental_ids.append(rental.id)
+
+    def assertContractsZip(self, content):
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertEqual(sorted(archive.namelist()),
+                             sorted(f'rent-{rental_id}.pdf' for rental_id in self.rental_ids))
+            for name in archive.namelist():
+                self.assertTrue(archive.read(name).startswith(b'%PDF'), name)
+
+    def test_command_writes_zip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'contracts.zip')
+            call_command('export_contracts', workers=1, output=output, stdout=StringIO())
+            with open(output, 'rb') as archive:
+                self.assertContractsZip(archive.read())
+
+    def test_view_streams_zip(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get('/api/v1/rentals/contracts/export/', {'status': 'active'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="contracts-active.zip"')
+        self.assertContractsZip(b''.join(response.streaming_content))
+
+    def test_view_requires_admin(self):
+        self.client.force_login(employee_model.objects.create(username='employee'))
+
+        self.assertEqual(self.client.get('/api/v1/rentals/contracts/export/').status_code, 403)
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ScheduleBroadcastTestCase(TestCase):
+    def setUp(self):
+        employee = employee_model.objects.create(username='employee')
+        car = Car.objects.create(employee=employee, name='Car', car_number='01A000AA', tech_passport_number='1')
+        rental = Rental.objects.create(employee=employee, car=car, fullname='Client', phone='+998900000000',
+                                       passport='AA0000000', rent_type='daily', rent_amount=Decimal('100.00'),
+                                       rent_period=2)
+        self.rental = rental
+        self.schedule_ids = list(rental.payment_schedule.values_list('id', flat=True))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_falls_back_to_snapshot(self):
+        broadcast_schedules(self.schedule_ids)
+
+        self.assertIsNone(get_events_since(0))
+        self.assertIsNone(build_snapshot([])['seq'])
+
+    def test_shared_cache_replays_events_in_order(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            broadcast_schedules(self.schedule_ids[:1])
+            broadcast_schedules(self.schedule_ids[1:])
+
+            self.assertEqual([seq for seq, _ in get_events_since(0)], [1, 2])
+            self.assertEqual([seq for seq, _ in get_events_since(1)], [2])
+            self.assertEqual(build_snapshot([])['seq'], 2)
+
+    def test_frames_are_json_objects(self):
+        async_to_sync(self.check_frames)()
+
+    async def check_frames(self):
+        communicator = WebsocketCommunicator(PaymentScheduleConsumer.as_asgi(), '/ws/payment_schedules/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await database_sync_to_async(broadcast_schedules)(self.schedule_ids)
+        delta = await communicator.receive_json_from()
+        self.assertEqual(delta['event'], 'delta')
+        self.assertEqual(sorted(schedule['id'] for schedule in delta['schedules']), sorted(self.schedule_ids))
+
+        await communicator.send_json_to({'action': 'snapshot'})
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['event'], 'snapshot')
+        await communicator.disconnect()
+
+    def test_created_schedules_are_broadcast_once_on_commit(self):
+        car = Car.objects.create(employee=self.rental.employee, name='Car', car_number='01A001AA',
+                                 tech_passport_number='1')
+        # Signal qabul qiluvchilari RentAppConfig.ready() da ulanadi; rent_app.signals bu yerda import qilinmaydi
+        with mock.patch('rent_app.utils.schedule_broadcast.broadcast_schedules') as broadcast, \
+                self.captureOnCommitCallbacks(execute=True):
+            rental = Rental.objects.create(employee=self.rental.employee, car=car, fullname='Client',
+                                           phone='+998900000000', passport='AA0000000', rent_type='daily',
+                                           rent_amount=Decimal('100.00'), rent_period=3)
+
+        broadcast.assert_called_once()
+        self.assertEqual(sorted(broadcast.call_args.args[0]),
+                         sorted(rental.payment_schedule.values_list('id', flat=True)))
+
+    def test_rolled_back_changes_are_not_broadcast(self):
+        with mock.patch('rent_app.utils.schedule_broadcast.broadcast_schedules') as broadcast:
+            with self.assertRaises(ValueError), transaction.atomic():
+                notify_schedules_changed([self.schedule_ids[0]])
+                raise ValueError
+            with self.captureOnCommitCallbacks(execute=True):
+                notify_schedules_changed([self.schedule_ids[1]])
+
+        broadcast.assert_called_once_with({self.schedule_ids[1]}, {})
+
+    def test_removal_reaches_rental_subscribers(self):
+        async_to_sync(self.check_removal)()
+
+    def delete_schedule(self, schedule_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            PaymentSchedule.objects.get(id=schedule_id).delete()
+
+    async def check_removal(self):
+        communicator = WebsocketCommunicator(PaymentScheduleConsumer.as_asgi(),
+                                             f'/ws/payment_schedules/?topics=rental:{self.rental.id}')
+        await communicator.connect()
+        subscriptions = await communicator.receive_json_from()
+        self.assertEqual(subscriptions['topics'], [f'rental:{self.rental.id}'])
+
+        await database_sync_to_async(self.delete_schedule)(self.schedule_ids[0])
+        delta = await communicator.receive_json_from()
+        self.assertEqual(delta['removed'], [self.schedule_ids[0]])
+        await communicator.disconnect()
+
+
+@override_settings(SMS_BACKEND='rent_app.utils.sms_backends.locmem.SMSBackend')
+class SendPaymentRemindersTestCase(TestCase):
+    def setUp(self):
+        employee = employee_model.objects.create(username='employee')
+        car = Car.objects.create(employee=employee, name='Car', car_number='01A000AA', tech_passport_number='1')
+        self.rental = Rental.objects.create(employee=employee, car=car, fullname='Client', phone='+998900000000',
+                                            passport='AA0000000', rent_type='daily', rent_amount=Decimal('100.00'),
+                                            rent_period=3)
+        # Hamma jadvallarning to'lov kuni bugun
+        PaymentSchedule.objects.filter(rental=self.rental).update(due_date=timezone.now())
+        self.schedule_ids = list(PaymentSchedule.objects.filter(rental=self.rental).order_by('id')
+                                 .values_list('id', flat=True))
+        locmem.outbox.clear()
+        self.addCleanup(locmem.outbox.clear)
+
+    def send_reminders(self, **options):
+        stdout = StringIO()
+        call_command('send_payment_reminders', stdout=stdout, stderr=StringIO(), **{'workers': 2, 'rate': 0, **options})
+        return stdout.getvalue()
+
+    def logged_schedule_ids(self):
+        return list(ReminderLog.objects.order_by('payment_schedule_id').values_list('payment_schedule_id', flat=True))
+
+    def test_second_run_sends_nothing(self):
+        self.assertIn('Reminders sent: 3, failed: 0, already sent: 0', self.send_reminders())
+        self.assertIn('Reminders sent: 0, failed: 0, already sent: 3', self.send_reminders())
+
+        self.assertEqual(len(locmem.outbox), 3)
+        self.assertEqual(self.logged_schedule_ids(), self.schedule_ids)
+
+    def test_shards_do_not_overlap(self):
+        first, second, third = self.schedule_ids
+
+        self.assertIn('Reminders sent: 2, failed: 0, already sent: 0', self.send_reminders(min_id=first, max_id=second))
+        self.assertEqual(self.logged_schedule_ids(), [first, second])
+        self.assertIn('Reminders sent: 1, failed: 0, already sent: 0', self.send_reminders(min_id=third))
+
+        self.assertEqual(len(locmem.outbox), 3)
+        self.assertEqual(self.logged_schedule_ids(), self.schedule_ids)
+
+    def test_failed_send_is_not_logged(self):
+        first, second, third = self.schedule_ids
+        # Bitta oqimda xabarlar jadval id tartibida yuboriladi
+        with mock.patch.object(locmem.SMSBackend, 'send', side_effect=['sid-1', RuntimeError('unavailable'), 'sid-3']):
+            output = self.send_reminders(workers=1)
+
+        self.assertIn('Reminders sent: 2, failed: 1, already sent: 0', output)
+        self.assertEqual(self.logged_schedule_ids(), [first, third])
+        # Keyingi ishga tushirishda faqat yuborilmagani qayta yuboriladi
+        self.assertIn('Reminders sent: 1, failed: 0, already sent: 2', self.send_reminders())
+        self.assertEqual(self.logged_schedule_ids(), self.schedule_ids)
+
+    def test_message_without_sid_is_not_sent(self):
+        # fail_silently=True bo'lgan backend xatoni yutib, sid'siz natija qaytaradi
+        with mock.patch.object(locmem.SMSBackend, 'send', return_value=None):
+            output = self.send_reminders()
+
+        self.assertIn('Reminders sent: 0, failed: 3, already sent: 0', output)
+        self.assertFalse(ReminderLog.objects.exists())
+
+class DelayedSMSBackend(BaseSMSBackend):
+    """
+    Matndagi soniya kutib yuboradi, "fail" raqamiga yuborishda xato beradi
+    """
+
+    def send(self, to_phone_number, message_body):
+        time.sleep(float(message_body))
+        if to_phone_number == 'fail':
+            raise RuntimeError('unavailable')
+        return f'sid-{to_phone_number}'
+
+
+class SendManyTestCase(SimpleTestCase):
+    def test_results_keep_input_order(self):
+        # Birinchi xabarlar eng oxirida tugaydi
+        messages = [(str(number), str(0.01 * (5 - number))) for number in range(5)]
+
+        results = DelayedSMSBackend().send_many(messages, workers=5)
+
+        self.assertEqual([result.phone for result in results], ['0', '1', '2', '3', '4'])
+        self.assertEqual([result.sid for result in results], ['sid-0', 'sid-1', 'sid-2', 'sid-3', 'sid-4'])
+
+    def test_errors_are_captured_per_message(self):
+        messages = [('1', '0'), ('fail', '0'), ('3', '0')]
+
+        results = DelayedSMSBackend().send_many(messages, workers=2)
+
+        self.assertEqual([result.sid for result in results], ['sid-1', None, 'sid-3'])
+        self.assertIsNone(results[0].error)
+        self.assertIsInstance(results[1].error, RuntimeError)
+        silent = DelayedSMSBackend(fail_silently=True).send_many(messages, workers=2)
+        self.assertEqual(silent[1], SMSResult('fail', None, None))
+
+    def test_rate_limiter_spaces_messages(self):
+        with mock.patch.object(sms_base.time, 'monotonic', return_value=100.0), \
+                mock.patch.object(sms_base.time, 'sleep') as sleep:
+            rate_limiter = RateLimiter(2)
+            for _ in range(3):
+                rate_limiter.wait()
+
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0])
+
+    def test_rate_limiter_without_rate_does_not_wait(self):
+        with mock.patch.object(sms_base.time, 'sleep') as sleep:
+            for rate in [None, 0]:
+                rate_limiter = RateLimiter(rate)
+                rate_limiter.wait()
+                rate_limiter.wait()
+
+        sleep.assert_not_called()
+
+class SMSBackendTestCase(SimpleTestCase):
+    messages = [('+998900000001', 'Birinchi'), ('+998900000002', 'Ikkinchi')]
+
+    def setUp(self):
+        locmem.outbox.clear()
+        self.addCleanup(locmem.outbox.clear)
+
+    @override_settings(SMS_BACKEND='rent_app.utils.sms_backends.locmem.SMSBackend')
+    def test_locmem_backend_collects_messages(self):
+        results = send_many(self.messages, workers=2)
+        sid = send_sms('+998900000003', 'Uchinchi')
+
+        self.assertEqual(sorted(locmem.outbox[:2]),
+                         sorted((result.phone, body, result.sid) for result, (_, body) in zip(results, self.messages)))
+        self.assertEqual(locmem.outbox[2], ('+998900000003', 'Uchinchi', sid))
+        self.assertTrue(all(result.error is None for result in results))
+
+    def test_filebased_backend_writes_json_lines(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Outbox papkasi backend yaratilganda ochiladi
+        file_path = os.path.join(directory.name, 'outbox', 'outbox.jsonl')
+
+        with self.settings(SMS_BACKEND='rent_app.utils.sms_backends.filebased.SMSBackend', SMS_FILE_PATH=file_path):
+            results = send_many(self.messages, workers=2)
+
+        with open(file_path, encoding='utf-8') as outbox:
+            lines = [json.loads(line) for line in outbox]
+        self.assertEqual(sorted((line['to'], line['body'], line['sid']) for line in lines),
+                         sorted((result.phone, body, result.sid) for result, (_, body) in zip(results, self.messages)))
+
+    def test_connection_options_override_settings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'outbox.jsonl')
+            backend = get_connection('rent_app.utils.sms_backends.filebased.SMSBackend', file_path=file_path,
+                                     fail_silently=True)
+
+        self.assertEqual(backend.file_path, file_path)
+        self.assertTrue(backend.fail_silently)
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentTransitionsTestCase(TransactionTestCase):
+    """
+    Bir xil mashina/ijara/jadval ustida parallel so'rovlar. Qaysi so'rov yutishi muhim emas,
+    holatlar izchil qolishi tekshiriladi. Qator qulflarini qo'llamaydigan SQLite'da o'tkazib yuboriladi.
+    """
+    workers = 6
+
+    def setUp(self):
+        self.employee = employee_model.objects.create(username='employee', is_staff=True)
+        self.car = Car.objects.create(employee=self.employee, name='Car', car_number='01A000AA',
+                                      tech_passport_number='1')
+
+    def create_rental(self, rent_period=3):
+        return Rental.objects.create(employee=self.employee, car=self.car, fullname='Client', phone='+998900000000',
+                                     passport='AA0000000', rent_type='daily', rent_amount=Decimal('100.00'),
+                                     rent_period=rent_period)
+
+    def run_parallel(self, requests):
+        """
+        Har bir request(client) ni alohida oqimda bir vaqtda chaqiradi, javob status kodlarini qaytaradi
+        """
+        barrier = threading.Barrier(len(requests))
+        statuses = []
+
+        def worker(request):
+            client = APIClient()
+            client.force_authenticate(self.employee)
+            try:
+                barrier.wait()
+                statuses.append(request(client).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(request,)) for request in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(statuses), len(requests), 'So\'rov xato bilan tugadi')
+        return statuses
+
+    def test_car_is_rented_once(self):
+        data = {'car_id': self.car.id, 'fullname': 'Client', 'phone': '+998900000000', 'passport': 'AA0000000',
+                'rent_type': 'daily', 'currency': 'uzs', 'rent_amount': '100.00', 'rent_period': 3}
+
+        statuses = self.run_parallel([lambda client: client.post('/api/v1/rentals/create/', data)] * self.workers)
+
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(400), self.workers - 1, statuses)
+        self.assertEqual(Rental.objects.filter(car=self.car, is_active=True).count(), 1)
+        self.assertEqual(PaymentSchedule.objects.filter(rental__car=self.car).count(), 3)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.status, 'rented')
+
+    def test_schedule_is_paid_once(self):
+        rental = self.create_rental()
+        schedule = rental.payment_schedule.order_by('due_date').first()
+        url = f'/api/v1/rentals/successfully_paid/?payment_id={schedule.id}'
+
+        statuses = self.run_parallel([lambda client: client.post(url)] * self.workers)
+
+        self.assertEqual(statuses.count(200), 1, statuses)
+        self.assertEqual(statuses.count(404), self.workers - 1, statuses)
+        schedule.refresh_from_db()
+        self.assertTrue(schedule.is_paid)
+        self.assertEqual(schedule.amount_paid, schedule.amount + schedule.penalty_amount)
+        rental.refresh_from_db()
+        self.assertEqual(rental.paid_total, schedule.amount_paid)
+        self.assertEqual(rental.unpaid_count, 2)
+        self.assertTrue(rental.is_active)
+
+    def test_full_payment_is_accepted_once(self):
+        rental = self.create_rental()
+        data = {'rental_id': rental.id, 'amount': str(rental.outstanding_amount)}
+
+        statuses = self.run_parallel([lambda client: client.post('/api/v1/payments/create/', data)] * self.workers)
+
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(400), self.workers - 1, statuses)
+        self.assertEqual(Payment.objects.filter(rental=rental).count(), 1)
+        allocated = PaymentAllocation.objects.filter(payment__rental=rental).aggregate(total=Sum('amount'))['total']
+        self.assertEqual(allocated, rental.outstanding_amount)
+        rental.refresh_from_db()
+        self.assertFalse(rental.is_active)
+        self.assertEqual(rental.outstanding_amount, Decimal('0.0'))
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.status, 'active')
+
+    def test_closing_and_payment_race(self):
+        rental = self.create_rental()
+        data = {'rental_id': rental.id, 'amount': str(rental.outstanding_amount)}
+        closing = lambda client: client.post('/api/v1/rentals/active/rental/closing/', {'rental_id': rental.id})
+        paying = lambda client: client.post('/api/v1/payments/create/', data)
+
+        statuses = self.run_parallel([closing, paying] * (self.workers // 2))
+
+        self.assertEqual(statuses.count(200) + statuses.count(201), 1, statuses)
+        rental.refresh_from_db()
+        self.assertFalse(rental.is_active)
+        self.assertFalse(PaymentSchedule.active_objects.filter(rental=rental).exists())
+        self.assertLessEqual(Payment.objects.filter(rental=rental).count(), 1)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.status, 'active')
@@ -0,0 +1,45 @@
+"""
+WebSocket obunalari uchun mavzular. Mijoz quyidagilarga obuna bo'lishi mumkin:
+    rent_type:<daily|monthly|credit>
+    bucket:<rent_type>:<today|overdue>
+    rental:<id>
+Bu modul modellarni import qilmaydi, chunki consumers Django ishga tushmasidan oldin import qilinadi.
+"""
+PAYMENT_SCHEDULES_GROUP = 'payment_schedules'
+TOPIC_RENT_TYPES = ('daily', 'monthly', 'credit')
+TOPIC_BUCKETS = ('today', 'overdue')
+
+
+def topic_group_name(topic):
+    """
+    Mavzuni channel layer guruhi nomiga aylantiradi, noto'g'ri mavzu uchun None qaytaradi
+    """
+    if not isinstance(topic, str):
+        return None
+    parts = topic.split(':')
+    if len(parts) == 2 and parts[0] == 'rent_type' and parts[1] in TOPIC_RENT_TYPES:
+        return f"{PAYMENT_SCHEDULES_GROUP}.rent_type.{parts[1]}"
+    if len(parts) == 3 and parts[0] == 'bucket' and parts[1] in TOPIC_RENT_TYPES and parts[2] in TOPIC_BUCKETS:
+        return f"{PAYMENT_SCHEDULES_GROUP}.bucket.{parts[1]}.{parts[2]}"
+    if len(parts) == 2 and parts[0] == 'rental' and parts[1].isdigit():
+        return f"{PAYMENT_SCHEDULES_GROUP}.rental.{int(parts[1])}"
+    return None
+
+
+def schedule_topics(rent_type, rental_id, payment_date, today):
+    topics = [f"rent_type:{rent_type}", f"rental:{rental_id}"]
+    if payment_date == today:
+        topics.append(f"bucket:{rent_type}:today")
+    elif payment_date < today:
+        topics.append(f"bucket:{rent_type}:overdue")
+    return topics
+
+
+def removal_topics():
+    """
+    O'chirilgan jadvalning ijara turi noma'lum, shuning uchun o'chirish barcha ijara turi va bo'lim
+    guruhlariga yuboriladi. rental:<id> guruhiga post_delete'da eslab qolingan ijara id si bo'yicha yuboriladi.
+    """
+    topics = [f"rent_type:{rent_type}" for rent_type in TOPIC_RENT_TYPES]
+    topics += [f"bucket:{rent_type}:{bucket}" for rent_type in TOPIC_RENT_TYPES for bucket in TOPIC_BUCKETS]
+    return topics
@@ -15,4 +15,5 @@ urlpatterns = [
     path('retrieve/<int:pk>/', views.RentalRetrieveAPIView.as_view()),
     path('successfully_paid/', views.SuccessfullyPaidAPIView.as_view()),
     path('generate_pdf/', views.GeneratePDF.as_view()),
+    path('contracts/export/', views.ExportContractsAPIView.as_view()),
 ]
@@ -1,2 +1,7 @@
-from .pdf_writer import pdf_writer
-from .sms_service import send_sms
+from .pdf_writer import pdf_writer, render_pdf
+from .sms_service import get_connection, send_many, send_sms
+from .penalty_accrual import accrue_penalties
+from .payment_allocation import allocate_payment
+from .dashboard_cache import dashboard_cache_key, invalidate_dashboard_cache
+from .contract_export import get_export_queryset, serialize_rentals, stream_contracts_zip, write_contracts_zip
+from .schedule_broadcast import notify_schedules_changed, notify_schedules_removed
@@ -0,0 +1,87 @@
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+from django.utils import timezone
+
+from rent_app.models import Rental
+from rent_app.serializers import RentalRetrieveSerializer
+from rent_app.utils.pdf_writer import render_pdf
+
+EXPORT_STATUSES = ('active', 'closed')
+
+
+def get_export_queryset(status, year=None, month=None):
+    """
+    Eksport qilinadigan ijaralar: barcha faollari yoki berilgan oyda yopilganlari
+    """
+    if status == 'active':
+        queryset = Rental.active_objects.all()
+    elif status == 'closed':
+        queryset = Rental.objects.filter(is_active=False)
+        if year:
+            queryset = queryset.filter(closing_date__year=year)
+        if month:
+            queryset = queryset.filter(closing_date__month=month)
+    else:
+        raise ValueError(f"Unknown export status: {status}")
+    return queryset.select_related('employee', 'car', 'car__employee').prefetch_related('payment_schedule')
+
+
+def serialize_rentals(queryset):
+    data = RentalRetrieveSerializer(queryset, many=True, context={'now': timezone.now()}).data
+    # Jarayonlar orasida uzatish uchun oddiy dict/list ko'rinishiga keltiramiz
+    return json.loads(json.dumps(data, default=str))
+
+
+class _ZipStream:
+    """
+    zipfile yozgan baytlarni yig'ib turadi, StreamingHttpResponse ularni bo'laklab yuboradi
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        chunk = b''.join(self._chunks)
+        self._chunks = []
+        return chunk
+
+
+def render_contracts(rentals_data, workers=None):
+    """
+    PDF'larni jarayonlar hovuzida parallel yaratadi va (fayl nomi, baytlar) juftliklarini qaytaradi
+    """
+    if not rentals_data:
+        return
+    workers = workers or os.cpu_count() or 1
+    # Fork qilingan jarayonlar ota jarayonning bazaga ulanishini buzmasligi uchun
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+        for data, content in zip(rentals_data, executor.map(render_pdf, rentals_data, chunksize=4)):
+            yield f"rent-{data['id']}.pdf", content
+
+
+def stream_contracts_zip(rentals_data, workers=None):
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        for filename, content in render_contracts(rentals_data, workers):
+            archive.writestr(filename, content)
+            yield stream.pop()
+    yield stream.pop()
+
+
+def write_contracts_zip(path, rentals_data, workers=None):
+    with open(path, 'wb') as output:
+        for chunk in stream_contracts_zip(rentals_data, workers):
+            output.write(chunk)
@@ -0,0 +1,18 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+from rent_app.models import RENT_TYPES
+
+DASHBOARD_CACHE_PREFIX = 'rent_app:dashboard'
+
+
+def dashboard_cache_key(rent_type, date):
+    return f"{DASHBOARD_CACHE_PREFIX}:{rent_type}:{date.isoformat()}"
+
+
+def invalidate_dashboard_cache():
+    """
+    Bugungi sana uchun barcha ijara turlarining dashboard keshini o'chiradi
+    """
+    today = timezone.localdate()
+    cache.delete_many([dashboard_cache_key(rent_type, today) for rent_type, _ in RENT_TYPES])
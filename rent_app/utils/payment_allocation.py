@@ -0,0 +1,88 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from rent_app.models import PaymentSchedule, Rental, payment_schedules_updated
+
+ALLOCATION_UPDATE_FIELDS = ['penalty_amount', 'amount_paid', 'is_paid', 'paid_date', 'payment_closing_date']
+
+
+@dataclass
+class ScheduleAllocation:
+    schedule_id: int
+    amount: Decimal
+    penalty_amount: Decimal
+    is_paid: bool
+    # amount ning jarimaga to'g'ri kelgan qismi (avval asosiy summa, keyin jarima qoplanadi)
+    penalty_part: Decimal = Decimal('0.0')
+
+
+@dataclass
+class AllocationResult:
+    amount: Decimal
+    allocated_amount: Decimal = Decimal('0.0')
+    remaining_amount: Decimal = Decimal('0.0')
+    unpaid_count: int = 0
+    allocations: list = field(default_factory=list)
+
+    @property
+    def is_fully_paid(self):
+        return self.unpaid_count == 0
+
+
+def allocate_payment(rental, amount, now=None):
+    """
+    To'lov summasini ijaraning to'lanmagan jadvallari bo'yicha muddat tartibida taqsimlaydi.
+    Jadvallar bir marta select_for_update bilan qulflanadi va o'zgarganlari bitta bulk_update bilan yoziladi.
+    """
+    now = now or timezone.now()
+    result = AllocationResult(amount=amount)
+
+    with transaction.atomic():
+        schedules = list(
+            PaymentSchedule.active_objects.select_for_update().filter(rental=rental).order_by('due_date', 'id')
+        )
+        changed = []
+        remaining = amount
+        for schedule in schedules:
+            # select_related o'rniga qulflangan ijara obyektidan foydalanamiz
+            schedule.rental = rental
+            if remaining <= 0:
+                result.unpaid_count += 1
+                continue
+
+            penalty = schedule.get_percentage_amount(now)
+            total_payment = schedule.amount + penalty - schedule.amount_paid
+            schedule.penalty_amount = penalty
+            schedule.paid_date = now
+            if remaining >= total_payment:
+                paid = total_payment
+                schedule.is_paid = True
+                schedule.payment_closing_date = now
+            else:
+                paid = remaining
+                result.unpaid_count += 1
+            principal_part = min(paid, max(schedule.amount - schedule.amount_paid, Decimal('0.0')))
+            schedule.amount_paid += paid
+            remaining -= paid
+            changed.append(schedule)
+            result.allocations.append(ScheduleAllocation(
+                schedule_id=schedule.id,
+                amount=paid,
+                penalty_amount=penalty,
+                is_paid=schedule.is_paid,
+                penalty_part=paid - principal_part,
+            ))
+
+        if changed:
+            PaymentSchedule.objects.bulk_update(changed, ALLOCATION_UPDATE_FIELDS)
+            Rental.objects.filter(pk=rental.pk).refresh_balances()
+            transaction.on_commit(
+                lambda: payment_schedules_updated.send(sender=PaymentSchedule, schedules=changed)
+            )
+
+    result.allocated_amount = amount - remaining
+    result.remaining_amount = remaining
+    return result
@@ -1,15 +1,77 @@
+import copy
+import glob
+import hashlib
+import json
 import os
+import tempfile
 from datetime import datetime
+from io import BytesIO
 import locale
+
+from django.conf import settings
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Indenter
 from reportlab.lib.styles import getSampleStyleSheet
 
+from home_app.metrics import PDF_RENDER_DURATION
+
 locale.setlocale(locale.LC_ALL, '')
 
 
+CONTRACTS_DIRECTORY = os.path.join(settings.MEDIA_ROOT, 'rentals', 'contracts')
+
+
+def contract_hash(data):
+    """
+    Seriyalangan ijara ma'lumotlarining xeshi, o'zgarmagan shartnoma qayta yaratilmaydi
+    """
+    content = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
 def pdf_writer(data):
+    """
+    Shartnoma PDF faylini o'qish uchun ochib qaytaradi. Fayl xesh bo'yicha diskda keshlanadi.
+    Yo'l emas ochilgan fayl qaytariladi: parallel so'rov eski versiyani o'chirsa ham ochilgan fayl o'qiladi.
+    """
+    if not os.path.exists(CONTRACTS_DIRECTORY):
+        os.makedirs(CONTRACTS_DIRECTORY, exist_ok=True)
+
+    pdf_file = os.path.join(CONTRACTS_DIRECTORY, f"contract{data['id']}-{contract_hash(data)}.pdf")
+    try:
+        return open(pdf_file, 'rb')
+    except FileNotFoundError:
+        pass
+
+    content = render_pdf(data)
+    with tempfile.NamedTemporaryFile(dir=CONTRACTS_DIRECTORY, suffix='.tmp', delete=False) as tmp:
+        tmp.write(content)
+    os.replace(tmp.name, pdf_file)
+    output = open(pdf_file, 'rb')
+
+    # Shu ijaraning eski versiyalarini o'chiramiz
+    for stale_file in glob.glob(os.path.join(CONTRACTS_DIRECTORY, f"contract{data['id']}-*.pdf")):
+        if stale_file != pdf_file:
+            try:
+                os.remove(stale_file)
+            except OSError:
+                pass
+
+    return output
+
+
+def render_pdf(data):
+    """
+    Shartnomani xotiradagi buferga yozib, PDF baytlarini qaytaradi
+    """
+    buffer = BytesIO()
+    with PDF_RENDER_DURATION.time():
+        build_contract(copy.deepcopy(data), buffer)
+    return buffer.getvalue()
+
+
+def build_contract(data, output):
     def format_date(date_str):
         try:
             date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
@@ -45,12 +107,7 @@ def pdf_writer(data):
         schedule['payment_closing_date'] = format_date(schedule['payment_closing_date'])
 
     # Create the PDF document with adjusted margins
-    directory = "media/rentals/contracts"
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-    pdf_file = f"{directory}/contract{data['id']}.pdf"
-    document = SimpleDocTemplate(pdf_file, pagesize=A4, leftMargin=40, rightMargin=40, topMargin=40, bottomMargin=40)
+    document = SimpleDocTemplate(output, pagesize=A4, leftMargin=40, rightMargin=40, topMargin=40, bottomMargin=40)
     styles = getSampleStyleSheet()
     elements = []
 
@@ -138,5 +195,3 @@ def pdf_writer(data):
 
     # Build the PDF
     document.build(elements)
-
-    return pdf_file
@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from rent_app.models import PaymentSchedule, Rental, calculate_penalty
+from rent_app.utils.dashboard_cache import invalidate_dashboard_cache
+
+PENALTY_RENT_TYPES = ('daily', 'monthly')
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def accrue_penalties(now=None, chunk_size=DEFAULT_CHUNK_SIZE, rent_types=PENALTY_RENT_TYPES):
+    """
+    To'lanmagan va muddati o'tgan to'lovlarning jarimasini qayta hisoblab bazaga yozadi.
+    Har bir ijara turi id oralig'i bo'yicha bo'laklarga ajratiladi va har bir bo'lak bitta UPDATE bilan yoziladi.
+    Ijara turi bo'yicha yangilangan qatorlar sonini qaytaradi.
+    """
+    now = now or timezone.now()
+    updated = {}
+
+    for rent_type in rent_types:
+        updated[rent_type] = 0
+        last_id = 0
+        while True:
+            rows = list(
+                PaymentSchedule.active_objects.filter(rental__rent_type=rent_type, due_date__lt=now, id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'rental_id', 'due_date', 'payment_date', 'penalty_amount',
+                             'rental__penalty_amount')[:chunk_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            # Bir xil jarimali qatorlar bitta When ichiga yig'iladi
+            penalties = defaultdict(list)
+            rental_ids = set()
+            for schedule_id, rental_id, due_date, payment_date, penalty_amount, penalty_rate in rows:
+                penalty = calculate_penalty(rent_type, penalty_rate, due_date, payment_date, now)
+                if penalty != penalty_amount:
+                    penalties[penalty].append(schedule_id)
+                    rental_ids.add(rental_id)
+            if not penalties:
+                continue
+
+            changed_ids = [schedule_id for ids in penalties.values() for schedule_id in ids]
+            with transaction.atomic():
+                updated[rent_type] += PaymentSchedule.objects.filter(id__in=changed_ids, is_paid=False).update(
+                    penalty_amount=Case(
+                        *[When(id__in=ids, then=Value(penalty)) for penalty, ids in penalties.items()],
+                        default=F('penalty_amount'),
+                        output_field=DecimalField(max_digits=11, decimal_places=2),
+                    )
+                )
+                Rental.objects.filter(id__in=rental_ids).refresh_balances()
+
+    # queryset.update() signal yubormaydi
+    if any(updated.values()):
+        invalidate_dashboard_cache()
+    return updated
@@ -0,0 +1,250 @@
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from rent_app.models import PaymentSchedule
+from rent_app.topics import PAYMENT_SCHEDULES_GROUP, removal_topics, schedule_topics, topic_group_name
+
+SEQUENCE_KEY = 'rent_app:payment_schedules:seq'
+EVENT_KEY_PREFIX = 'rent_app:payment_schedules:event'
+# Har bir jarayonning o'z nusxasi: HTTP worker, daphne va cron buyruqlari umumiy seq/buferga ega bo'lmaydi
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+DELTA_FIELDS = ['id', 'rental_id', 'amount', 'penalty_amount', 'amount_paid', 'due_date', 'payment_date', 'is_paid',
+                'rental__rent_type', 'rental__currency']
+
+_local = threading.local()
+_debounce_lock = threading.Lock()
+_debounce_ids = set()
+_debounce_rentals = {}
+_debounce_timer = None
+
+
+def _pending_ids():
+    if not hasattr(_local, 'pending_ids'):
+        _local.pending_ids = set()
+    return _local.pending_ids
+
+
+def _pending_rentals():
+    # O'chirilgan jadval id -> ijara id: o'chirilgandan keyin bazadan topib bo'lmaydi
+    if not hasattr(_local, 'pending_rentals'):
+        _local.pending_rentals = {}
+    return _local.pending_rentals
+
+
+def notify_schedules_changed(schedule_ids):
+    """
+    O'zgargan to'lov jadvallarini yig'adi, tranzaksiya yakunlangach ular bitta xabar bilan yuboriladi
+    """
+    schedule_ids = [schedule_id for schedule_id in schedule_ids if schedule_id is not None]
+    if not schedule_ids:
+        return
+    pending_ids = _pending_ids()
+    if pending_ids and not _flush_registered():
+        # Oldingi tranzaksiya bekor qilingan (on_commit callback'lari o'chirilgan): uning jadvallari yuborilmaydi
+        pending_ids.clear()
+        _pending_rentals().clear()
+    pending_ids.update(schedule_ids)
+    # Bir tranzaksiyada bir nechta callback bo'lsa ham, birinchisi hammasini yuboradi, qolganlari bo'sh qaytadi
+    transaction.on_commit(_flush_transaction)
+
+
+def _flush_registered():
+    return any(callback[1] is _flush_transaction for callback in transaction.get_connection().run_on_commit)
+
+
+def notify_schedules_removed(schedules):
+    """
+    O'chirilgan jadvallar: ijara id si eslab qolinadi, o'chirish rental:<id> obunachilariga ham yetib boradi
+    """
+    notify_schedules_changed([schedule.pk for schedule in schedules])
+    _pending_rentals().update((schedule.pk, schedule.rental_id) for schedule in schedules if schedule.pk)
+
+
+def _flush_transaction():
+    pending_ids = _pending_ids()
+    if not pending_ids:
+        return
+    schedule_ids = set(pending_ids)
+    pending_ids.clear()
+    pending_rentals = _pending_rentals()
+    removed_rentals = dict(pending_rentals)
+    pending_rentals.clear()
+
+    debounce = settings.PAYMENT_SCHEDULE_BROADCAST_DEBOUNCE
+    if not debounce:
+        broadcast_schedules(schedule_ids, removed_rentals)
+        return
+
+    global _debounce_timer
+    with _debounce_lock:
+        _debounce_ids.update(schedule_ids)
+        _debounce_rentals.update(removed_rentals)
+        if _debounce_timer is None:
+            _debounce_timer = threading.Timer(debounce, _flush_debounced)
+            _debounce_timer.daemon = True
+            _debounce_timer.start()
+
+
+def _flush_debounced():
+    global _debounce_timer
+    with _debounce_lock:
+        schedule_ids = set(_debounce_ids)
+        _debounce_ids.clear()
+        removed_rentals = dict(_debounce_rentals)
+        _debounce_rentals.clear()
+        _debounce_timer = None
+    try:
+        broadcast_schedules(schedule_ids, removed_rentals)
+    finally:
+        connections.close_all()
+
+
+def _delta_schedule(row):
+    return {
+        'id': row['id'],
+        'rental_id': row['rental_id'],
+        'rent_type': row['rental__rent_type'],
+        'currency': row['rental__currency'],
+        'amount': row['amount'],
+        'penalty_amount': row['penalty_amount'],
+        'amount_paid': row['amount_paid'],
+        'due_date': row['due_date'],
+        'payment_date': row['payment_date'],
+        'is_paid': row['is_paid'],
+    }
+
+
+def build_delta(schedule_ids):
+    rows = PaymentSchedule.objects.filter(id__in=schedule_ids).order_by('id').values(*DELTA_FIELDS)
+    schedules = [_delta_schedule(row) for row in rows]
+    found_ids = {schedule['id'] for schedule in schedules}
+    return {
+        'event': 'delta',
+        'schedules': schedules,
+        'removed': sorted(set(schedule_ids) - found_ids),
+    }
+
+
+def build_snapshot(topics):
+    """
+    Mavzular bo'yicha joriy holat. Mavzu bo'lmasa barcha to'lanmagan jadvallar qaytariladi.
+    """
+    today = timezone.localdate()
+    condition = Q()
+    for topic in topics:
+        parts = topic.split(':')
+        if parts[0] == 'rent_type':
+            condition |= Q(is_paid=False, rental__rent_type=parts[1])
+        elif parts[0] == 'bucket' and parts[2] == 'today':
+            condition |= Q(is_paid=False, rental__rent_type=parts[1], payment_date=today)
+        elif parts[0] == 'bucket' and parts[2] == 'overdue':
+            condition |= Q(is_paid=False, rental__rent_type=parts[1], payment_date__lt=today)
+        elif parts[0] == 'rental':
+            condition |= Q(rental_id=int(parts[1]))
+    if not topics:
+        condition = Q(is_paid=False)
+
+    seq = current_sequence()
+    rows = PaymentSchedule.objects.filter(condition).order_by('id').values(*DELTA_FIELDS)
+    return {
+        'event': 'snapshot',
+        'seq': seq,
+        'schedules': [_delta_schedule(row) for row in rows],
+    }
+
+
+def replay_supported():
+    """
+    seq va qayta yuborish buferi barcha jarayonlar uchun umumiy keshda (Redis) bo'lishi kerak.
+    Aks holda xabarlar seq'siz yuboriladi va resume har doim snapshot qaytaradi.
+    """
+    return not isinstance(caches['default'], PROCESS_LOCAL_CACHES)
+
+
+def next_sequence():
+    if not replay_supported():
+        return None
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    try:
+        return cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # Kalit add va incr orasida o'chib ketgan bo'lsa
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        return cache.incr(SEQUENCE_KEY)
+
+
+def current_sequence():
+    if not replay_supported():
+        return None
+    return cache.get(SEQUENCE_KEY, 0)
+
+
+def get_events_since(seq):
+    """
+    seq dan keyingi xabarlarni halqa buferdan qaytaradi: [(seq, {guruh: xabar})].
+    Bufer yetarli bo'lmasa None qaytaradi va mijoz snapshot oladi.
+    """
+    current = current_sequence()
+    if current is None or seq > current or current - seq > settings.PAYMENT_SCHEDULE_REPLAY_BUFFER_SIZE:
+        return None
+    sequences = list(range(seq + 1, current + 1))
+    events = cache.get_many([f"{EVENT_KEY_PREFIX}:{event_seq}" for event_seq in sequences])
+    if len(events) != len(sequences):
+        return None
+    return [(event_seq, events[f"{EVENT_KEY_PREFIX}:{event_seq}"]) for event_seq in sequences]
+
+
+def route_delta(delta, today, removed_rentals=None):
+    """
+    Deltani mavzular bo'yicha ajratadi: {guruh nomi: delta}.
+    removed_rentals - o'chirilgan jadval id -> ijara id, o'chirish shu ijara guruhiga ham yuboriladi.
+    """
+    routed = defaultdict(lambda: {'event': 'delta', 'schedules': [], 'removed': []})
+    for schedule in delta['schedules']:
+        for topic in schedule_topics(schedule['rent_type'], schedule['rental_id'], schedule['payment_date'], today):
+            routed[topic_group_name(topic)]['schedules'].append(schedule)
+    if delta['removed']:
+        for topic in removal_topics():
+            routed[topic_group_name(topic)]['removed'] = delta['removed']
+        for schedule_id in delta['removed']:
+            rental_id = (removed_rentals or {}).get(schedule_id)
+            if rental_id is not None:
+                routed[topic_group_name(f"rental:{rental_id}")]['removed'].append(schedule_id)
+    # Mavzuga obuna bo'lmagan mijozlar uchun umumiy guruh
+    routed[PAYMENT_SCHEDULES_GROUP] = delta
+    return routed
+
+
+def broadcast_schedules(schedule_ids, removed_rentals=None):
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not schedule_ids:
+        return
+    delta = build_delta(schedule_ids)
+    seq = next_sequence()
+    messages = {}
+    for group_name, group_delta in route_delta(delta, timezone.localdate(), removed_rentals).items():
+        messages[group_name] = json.dumps(dict(group_delta, seq=seq), cls=DjangoJSONEncoder)
+    if seq is not None:
+        # Qayta ulangan mijozlar uchun halqa bufer
+        cache.set(f"{EVENT_KEY_PREFIX}:{seq}", messages, settings.PAYMENT_SCHEDULE_REPLAY_TIMEOUT)
+
+    for group_name, data in messages.items():
+        async_to_sync(channel_layer.group_send)(
+            group_name,
+            {
+                'type': 'send_update',
+                'data': data
+            }
+        )
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+SMSResult = namedtuple('SMSResult', ['phone', 'sid', 'error'])
+
+
+class RateLimiter:
+    """
+    Oqimlar orasida umumiy bo'lgan oddiy cheklovchi: soniyasiga rate tadan ko'p ruxsat bermaydi
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class BaseSMSBackend:
+    """
+    SMS yuboruvchi backendlar uchun asos. Voris sinflar send() ni amalga oshiradi.
+    """
+
+    def __init__(self, fail_silently=False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def send(self, to_phone_number, message_body):
+        raise NotImplementedError('subclasses of BaseSMSBackend must override send() method')
+
+    def send_many(self, messages, workers=1, rate=None):
+        """
+        (telefon, matn) juftliklarini parallel yuboradi va kirish tartibida SMSResult ro'yxatini qaytaradi
+        """
+        rate_limiter = RateLimiter(rate)
+
+        def send_one(message):
+            to_phone_number, message_body = message
+            rate_limiter.wait()
+            try:
+                return SMSResult(to_phone_number, self.send(to_phone_number, message_body), None)
+            except Exception as e:
+                if not self.fail_silently:
+                    return SMSResult(to_phone_number, None, e)
+                return SMSResult(to_phone_number, None, None)
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            return list(executor.map(send_one, messages))
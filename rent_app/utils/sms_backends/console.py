@@ -0,0 +1,23 @@
+import sys
+import threading
+import uuid
+
+from .base import BaseSMSBackend
+
+
+class SMSBackend(BaseSMSBackend):
+    """
+    SMS'larni yubormasdan konsolga chiqaradi
+    """
+
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send(self, to_phone_number, message_body):
+        sid = uuid.uuid4().hex
+        with self._lock:
+            self.stream.write(f"To: {to_phone_number}\nSid: {sid}\n{message_body}\n{'-' * 79}\n")
+            self.stream.flush()
+        return sid
@@ -0,0 +1,31 @@
+import json
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .base import BaseSMSBackend
+
+
+class SMSBackend(BaseSMSBackend):
+    """
+    Har bir SMS'ni outbox faylga bitta JSON qator qilib yozadi
+    """
+
+    def __init__(self, file_path=None, **kwargs):
+        super().__init__(**kwargs)
+        self.file_path = str(file_path or settings.SMS_FILE_PATH)
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def send(self, to_phone_number, message_body):
+        sid = uuid.uuid4().hex
+        line = json.dumps({'sid': sid, 'to': to_phone_number, 'body': message_body,
+                           'created_at': timezone.now().isoformat()}, ensure_ascii=False)
+        with self._lock, open(self.file_path, 'a', encoding='utf-8') as outbox:
+            outbox.write(line + '\n')
+        return sid
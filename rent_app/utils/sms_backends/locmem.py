@@ -0,0 +1,16 @@
+import threading
+import uuid
+
+from .base import BaseSMSBackend
+
+# Testlar uchun: yuborilgan SMS'lar (telefon, matn, sid) ko'rinishida shu ro'yxatga tushadi
+outbox = []
+_lock = threading.Lock()
+
+
+class SMSBackend(BaseSMSBackend):
+    def send(self, to_phone_number, message_body):
+        sid = uuid.uuid4().hex
+        with _lock:
+            outbox.append((to_phone_number, message_body, sid))
+        return sid
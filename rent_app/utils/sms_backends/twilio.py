@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+from django.conf import settings
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from .base import BaseSMSBackend
+
+
+@lru_cache(maxsize=None)
+def get_client(account_sid, auth_token):
+    """
+    Bitta Twilio klienti, ichidagi requests.Session ulanishlarni qayta ishlatadi
+    """
+    return Client(account_sid, auth_token, http_client=TwilioHttpClient(pool_connections=True))
+
+
+class SMSBackend(BaseSMSBackend):
+    def __init__(self, account_sid=None, auth_token=None, from_phone_number=None, **kwargs):
+        super().__init__(**kwargs)
+        self.client = get_client(account_sid or settings.TWILIO_ACCOUNT_SID, auth_token or settings.TWILIO_AUTH_TOKEN)
+        self.from_phone_number = from_phone_number or settings.TWILIO_PHONE_NUMBER
+
+    def send(self, to_phone_number, message_body):
+        message = self.client.messages.create(
+            body=message_body,
+            from_=self.from_phone_number,
+            to=to_phone_number
+        )
+        return message.sid
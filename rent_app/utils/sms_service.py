@@ -1,14 +1,38 @@
-from twilio.rest import Client
 from django.conf import settings
+from django.utils.module_loading import import_string
 
+from home_app.metrics import SMS_MESSAGES
 
-def send_sms(to_phone_number, message_body):
-    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
 
-    message = client.messages.create(
-        body=message_body,
-        from_=settings.TWILIO_PHONE_NUMBER,
-        to=to_phone_number
-    )
+def get_connection(backend=None, **kwargs):
+    """
+    Sozlamalardagi SMS_BACKEND bo'yicha backend obyektini qaytaradi.
+    Twilio faqat u tanlanganda import qilinadi.
+    """
+    backend_class = import_string(backend or settings.SMS_BACKEND)
+    return backend_class(**kwargs)
 
-    return message.sid
+
+def backend_name(connection):
+    # rent_app.utils.sms_backends.twilio.SMSBackend -> twilio
+    return connection.__class__.__module__.rsplit('.', 1)[-1]
+
+
+def send_sms(to_phone_number, message_body, connection=None):
+    connection = connection or get_connection()
+    try:
+        sid = connection.send(to_phone_number, message_body)
+    except Exception:
+        SMS_MESSAGES.labels(backend_name(connection), 'failed').inc()
+        raise
+    SMS_MESSAGES.labels(backend_name(connection), 'sent').inc()
+    return sid
+
+
+def send_many(messages, connection=None, workers=1, rate=None):
+    connection = connection or get_connection()
+    results = connection.send_many(messages, workers=workers, rate=rate)
+    sent = sum(1 for result in results if result.error is None and result.sid is not None)
+    SMS_MESSAGES.labels(backend_name(connection), 'sent').inc(sent)
+    SMS_MESSAGES.labels(backend_name(connection), 'failed').inc(len(results) - sent)
+    return results
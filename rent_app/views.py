@@ -1,8 +1,10 @@
 from decimal import Decimal
 
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -10,14 +12,20 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.response import Response
 from datetime import date, timedelta
-from rest_framework import generics, permissions, parsers
+from rest_framework import filters, generics, permissions, parsers
 from rest_framework.views import APIView
 
 from car_app.models import Car
-from rent_app.models import PaymentSchedule, Rental
+from home_app.pagination import RentalCursorPagination
+from payment.models import PaymentAllocation
+from rent_app.models import PaymentSchedule, Rental, payment_schedules_updated
 from rent_app.serializers import PaymentScheduleDashboardSerializer, PaymentScheduleListSerializer, \
     CreateRentalSerializer, ActiveRentalListSerializer, RentalRetrieveSerializer, NoActiveRentalListSerializer
-from rent_app.utils import pdf_writer
+from rent_app.utils import dashboard_cache_key, get_export_queryset, pdf_writer, serialize_rentals, \
+    stream_contracts_zip
+
+
+CLOSING_UPDATE_FIELDS = ['is_paid', 'amount', 'penalty_amount', 'paid_date', 'payment_closing_date']
 
 
 # @method_decorator(csrf_exempt, name='dispatch')
@@ -60,48 +68,56 @@ class PaymentScheduleDashboardView(generics.ListAPIView):
     def get_queryset(self):
         rent_type = self.request.query_params.get('rent_type', 'daily')
 
-        if rent_type == 'daily':
-            return PaymentSchedule.active_objects.filter(
-                rental__rent_type=rent_type
-            )
-        elif rent_type in ['monthly', 'credit']:
+        if rent_type in ['daily', 'monthly', 'credit']:
             return PaymentSchedule.active_objects.filter(
                 rental__rent_type=rent_type
-            )
+            ).select_related('rental', 'rental__car')
         else:
             return PaymentSchedule.objects.none()
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
         rent_type = self.request.query_params.get('rent_type', 'daily')
-        today = timezone.localdate()
-        data = []
+        now = timezone.now()
+        today = timezone.localdate(now)
 
-        filtered_schedules = queryset.filter(payment_date__lt=today)
-        data.append({
-            'date': 'unpaid',
-            'payment_schedules': PaymentScheduleListSerializer(filtered_schedules.order_by('-due_date'), many=True).data
-        })
+        if rent_type not in ['daily', 'monthly', 'credit']:
+            return Response(self.get_dashboard_data(rent_type, now, today))
+
+        cache_key = dashboard_cache_key(rent_type, today)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_dashboard_data(rent_type, now, today)
+            cache.set(cache_key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+        return Response(data)
 
+    def get_dashboard_data(self, rent_type, now, today):
         if rent_type == 'daily':
-            date_ranges = [today + timedelta(days=i) for i in range(3)]
-            for d in date_ranges:
-                filtered_schedules = queryset.filter(payment_date=d)
-                data.append({
-                    'date': d,
-                    'payment_schedules': PaymentScheduleListSerializer(filtered_schedules, many=True).data
-                })
+            date_ranges = [(d, d) for d in (today + timedelta(days=i) for i in range(3))]
         elif rent_type in ['monthly', 'credit']:
             start_date = today.replace(day=1)
-            date_ranges = [start_date + relativedelta(months=i) for i in range(3)]
-            for d in date_ranges:
-                filtered_schedules = queryset.filter(payment_date__range=(d, d.replace(month=d.month + 1) - timedelta(days=1)))
-                data.append({
-                    'date': d,
-                    'payment_schedules': PaymentScheduleListSerializer(filtered_schedules, many=True).data
-                })
+            months = [start_date + relativedelta(months=i) for i in range(3)]
+            date_ranges = [(d, d + relativedelta(months=1) - timedelta(days=1)) for d in months]
+        else:
+            date_ranges = []
 
-        return Response(data)
+        # Barcha oynani bitta so'rovda olib, Python'da bo'limlarga ajratamiz
+        window_end = date_ranges[-1][1] if date_ranges else today - timedelta(days=1)
+        schedules = list(self.get_queryset().filter(payment_date__lte=window_end).order_by('due_date', 'id'))
+
+        unpaid = [schedule for schedule in schedules if schedule.payment_date < today]
+        unpaid.reverse()
+        data = [{
+            'date': 'unpaid',
+            'payment_schedules': PaymentScheduleListSerializer(unpaid, many=True, context={'now': now}).data
+        }]
+        for start, end in date_ranges:
+            bucket = [schedule for schedule in schedules if start <= schedule.payment_date <= end]
+            data.append({
+                'date': start,
+                'payment_schedules': PaymentScheduleListSerializer(bucket, many=True, context={'now': now}).data
+            })
+
+        return data
 
     @swagger_auto_schema(manual_parameters=[
         openapi.Parameter(
@@ -118,16 +134,22 @@ class PaymentScheduleDashboardView(generics.ListAPIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ActiveRentalListAPIView(generics.ListAPIView):
-    queryset = Rental.active_objects.all()
+    queryset = Rental.active_objects.select_related('car', 'employee')
     serializer_class = ActiveRentalListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RentalCursorPagination
+    # Qarzdorlik va keyingi to'lov sanasi Rental'da saqlanadi, saralash indeks bo'yicha bajariladi
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['start_date', 'outstanding_amount', 'next_due_date']
+    ordering = ['-start_date', '-id']
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class NoActiveRentalListAPIView(generics.ListAPIView):
-    queryset = Rental.objects.all()
+    queryset = Rental.objects.select_related('car', 'employee')
     serializer_class = NoActiveRentalListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RentalCursorPagination
 
     def get_queryset(self):
         return super().get_queryset().filter(is_active=False, bad_rental=False)
@@ -135,9 +157,10 @@ class NoActiveRentalListAPIView(generics.ListAPIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class NoActiveBadRentalListAPIView(generics.ListAPIView):
-    queryset = Rental.objects.all()
+    queryset = Rental.objects.select_related('car', 'employee')
     serializer_class = NoActiveRentalListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RentalCursorPagination
 
     def get_queryset(self):
         return super().get_queryset().filter(is_active=False, bad_rental=True)
@@ -164,6 +187,11 @@ class RentalRetrieveAPIView(generics.RetrieveAPIView):
     serializer_class = RentalRetrieveSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['now'] = timezone.now()
+        return context
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class SuccessfullyPaidAPIView(APIView):
@@ -177,32 +205,38 @@ class SuccessfullyPaidAPIView(APIView):
     ])
     def post(self, request):
         payment_id = request.query_params.get('payment_id')
-        try:
-            payment = PaymentSchedule.active_objects.get(id=payment_id)
-        except PaymentSchedule.DoesNotExist:
-            return Response(data={'detail': 'To\'lov topilmadi'}, status=404)
+        rental_ids = PaymentSchedule.active_objects.filter(id=payment_id).values('rental_id')
 
         with transaction.atomic():
+            # Qulflash tartibi to'lov yaratishdagi bilan bir xil: avval ijara, keyin jadval
+            try:
+                rental = Rental.objects.select_for_update().get(id__in=rental_ids)
+            except Rental.DoesNotExist:
+                return Response(data={'detail': 'To\'lov topilmadi'}, status=404)
+            try:
+                payment = PaymentSchedule.active_objects.select_for_update().get(id=payment_id, rental=rental)
+            except PaymentSchedule.DoesNotExist:
+                # Boshqa so'rov shu jadvalni allaqachon to'lagan
+                return Response(data={'detail': 'To\'lov topilmadi'}, status=404)
+            payment.rental = rental
+
+            now = timezone.now()
+            settled_amount = max(payment.amount - payment.amount_paid, Decimal('0.0'))
+            # Undirilmagan jarima kechiriladi: jarimaning to'langan qismi saqlanadi, asosiy summa to'liq yopiladi
+            payment.penalty_amount = max(payment.amount_paid - payment.amount, Decimal('0.0'))
+            payment.amount_paid = max(payment.amount_paid, payment.amount)
             payment.is_paid = True
-            amount = payment.get_total_amount()
-            payment.make_payment(amount)
+            payment.paid_date = now
+            payment.payment_closing_date = now
             payment.employee = request.user
-            payment.save()
-
-            rental = payment.rental
-            payment_schedules = PaymentSchedule.active_objects.filter(rental=rental)
-            if payment_schedules.count() == 0:
-                rental.is_active = False
-                rental.closing_date = timezone.now().date()
-                rental.save()
-                car = rental.car
-                if rental.rent_type != 'credit':
-                    car.status = 'active'
-                    car.save()
-                else:
-                    car.status = 'sold'
-                    car.is_active = False
-                    car.save()
+            payment.save(update_fields=['penalty_amount', 'amount_paid', 'is_paid', 'paid_date',
+                                        'payment_closing_date', 'employee'])
+            if settled_amount:
+                # Payment'siz qabul qilingan qism ham daftarga yoziladi
+                PaymentAllocation.objects.create(payment=None, schedule=payment, amount=settled_amount)
+
+            if not PaymentSchedule.active_objects.filter(rental=rental).exists():
+                rental.close()
 
         return Response(data={'message': 'To\'lov muvaffaqiyatli amalga oshirildi'}, status=200)
 
@@ -222,18 +256,47 @@ class GeneratePDF(APIView):
             return Response(data={'detail': 'Ijara ID kerak'}, status=400)
 
         try:
-            rental = Rental.objects.get(id=rent_id)
+            rental = Rental.objects.select_related('employee', 'car', 'car__employee').get(id=rent_id)
         except Rental.DoesNotExist:
             return Response(data={'detail': 'Ijara topilmadi'}, status=404)
 
-        serializer = RentalRetrieveSerializer(rental)
-        pdf_path = pdf_writer(serializer.data)
+        serializer = RentalRetrieveSerializer(rental, context={'now': timezone.now()})
+        return FileResponse(pdf_writer(serializer.data), as_attachment=True, filename=f"rent-{rental.id}.pdf",
+                            content_type='application/pdf')
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportContractsAPIView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter(
+            'status', openapi.IN_QUERY, description="Faol yoki yopilgan ijaralar",
+            type=openapi.TYPE_STRING, enum=['active', 'closed'],
+        ),
+        openapi.Parameter(
+            'year', openapi.IN_QUERY, description="Yopilgan yil",
+            type=openapi.TYPE_INTEGER
+        ),
+        openapi.Parameter(
+            'month', openapi.IN_QUERY, description="Yopilgan oy",
+            type=openapi.TYPE_INTEGER
+        ),
+    ])
+    def get(self, request, *args, **kwargs):
+        status = request.query_params.get('status', 'active')
+        if status not in ['active', 'closed']:
+            return Response(data={'detail': 'Noto\'g\'ri holat'}, status=400)
+        try:
+            year = int(request.query_params['year']) if request.query_params.get('year') else None
+            month = int(request.query_params['month']) if request.query_params.get('month') else None
+        except ValueError:
+            return Response(data={'detail': 'Yil va oy butun son bo\'lishi kerak'}, status=400)
 
-        with open(pdf_path, 'rb') as pdf:
-            pdf = pdf.read()
-            response = HttpResponse(pdf, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="rent-{rental.id}.pdf"'
-            return response
+        rentals_data = serialize_rentals(get_export_queryset(status, year, month))
+        response = StreamingHttpResponse(stream_contracts_zip(rentals_data), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="contracts-{status}.zip"'
+        return response
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -320,33 +383,33 @@ class ClosingActiveRentalAPIView(APIView):
         rental_id = request.data.get('rental_id')
         if rental_id is None:
             return Response(data={'detail': 'Ijara ID kerak'}, status=400)
-        try:
-            rental = Rental.active_objects.get(id=rental_id)
-        except Rental.DoesNotExist:
-            return Response(data={'detail': 'Ijara topilmadi'}, status=404)
 
-        if rental.rent_type == 'credit':
-            return Response(data={'detail': 'Nasiya savdoda ijara yopilmaydi'}, status=400)
-
-        rental.is_active = False
-        rental.closing_date = timezone.now().date()
-        rental.save()
-        payment_schedules = PaymentSchedule.active_objects.filter(rental=rental)
-        for payment in payment_schedules:
-            payment.is_paid = True
-            payment.amount = payment.amount_paid
-            payment.penalty_amount = Decimal('0.0')
-            payment.paid_date = timezone.now()
-            payment.payment_closing_date = timezone.now()
-            payment.save()
-        if rental.rent_type == 'credit':
-            car = rental.car
-            car.status = 'sold'
-            car.is_active = False
-        else:
-            car = rental.car
-            car.status = 'active'
-        car.save()
+        with transaction.atomic():
+            # Ijara qatori qulflanadi: parallel to'lov yoki yopish so'rovi tugashini kutadi
+            try:
+                rental = Rental.active_objects.select_for_update().get(id=rental_id)
+            except Rental.DoesNotExist:
+                return Response(data={'detail': 'Ijara topilmadi'}, status=404)
+
+            if rental.rent_type == 'credit':
+                return Response(data={'detail': 'Nasiya savdoda ijara yopilmaydi'}, status=400)
+
+            now = timezone.now()
+            payment_schedules = list(PaymentSchedule.active_objects.select_for_update().filter(rental=rental))
+            for payment in payment_schedules:
+                payment.is_paid = True
+                payment.amount = payment.amount_paid
+                payment.penalty_amount = Decimal('0.0')
+                payment.paid_date = now
+                payment.payment_closing_date = now
+            if payment_schedules:
+                # Har bir jadval uchun save() o'rniga bitta UPDATE, qoldiqlar va xabar ham bir marta
+                PaymentSchedule.objects.bulk_update(payment_schedules, CLOSING_UPDATE_FIELDS)
+                Rental.objects.filter(pk=rental.pk).refresh_balances()
+                transaction.on_commit(
+                    lambda: payment_schedules_updated.send(sender=PaymentSchedule, schedules=payment_schedules)
+                )
+            rental.close()
         return Response(data={'message': 'Ijara yopildi'}, status=200)
 
 
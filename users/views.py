@@ -11,6 +11,7 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from home_app.pagination import EmployeeCursorPagination
 from .serializers import UserSerializer, ChangePasswordSerializer, EmployeesListSerializer, EmployeeUpdateSerializer
 
 User = get_user_model()
@@ -475,6 +476,7 @@ class UserListAPIView(ListAPIView):
     queryset = User.objects.all()
     serializer_class = EmployeesListSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = EmployeeCursorPagination
 
 
 @method_decorator(csrf_exempt, name='dispatch')